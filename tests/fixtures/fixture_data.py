@@ -35,13 +35,13 @@ def post_with_group(user, group):
 
 
 @pytest.fixture
-def few_posts_with_group(mixer, user, group):
+def few_posts_with_group(mock_media, mixer, user, group):
     """Return one record with the same author and group."""
     posts = mixer.cycle(20).blend(Post, author=user, group=group)
     return posts[0]
 
 
 @pytest.fixture
-def another_few_posts_with_group_with_follower(mixer, user, another_user, group):
+def another_few_posts_with_group_with_follower(mock_media, mixer, user, another_user, group):
     mixer.blend('posts.Follow', user=user, author=another_user)
     mixer.cycle(20).blend(Post, author=another_user, group=group)
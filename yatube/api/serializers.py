@@ -0,0 +1,83 @@
+"""Компактное представление объектов в JSON API.
+
+Связанные объекты передаются ключами (username автора, slug группы), а не
+вложенными словарями. Параметр ``?fields=`` оставляет только нужные поля.
+"""
+from django.core.exceptions import ValidationError
+
+from posts import counters
+
+POST_FIELDS = ('id', 'text', 'pub_date', 'updated_at', 'author', 'group',
+               'image')
+POST_DETAIL_FIELDS = POST_FIELDS + ('comment_count',)
+COMMENT_FIELDS = ('id', 'post', 'author', 'text', 'created')
+GROUP_FIELDS = ('slug', 'title', 'description')
+PROFILE_FIELDS = ('username', 'full_name', 'post_count', 'follower_count',
+                  'following_count')
+
+
+def get_fields(request, allowed):
+    """Поля из ``?fields=`` или все поля ресурса."""
+    value = request.GET.get('fields')
+    if not value:
+        return allowed
+    fields = tuple(value.split(','))
+    unknown = set(fields) - set(allowed)
+    if unknown:
+        raise ValidationError(
+            f'Неизвестные поля: {", ".join(sorted(unknown))}')
+    return fields
+
+
+def _select(data, fields):
+    return {field: data[field] for field in fields}
+
+
+def post(obj, fields=POST_FIELDS):
+    return _select({
+        'id': obj.pk,
+        'text': obj.text,
+        'pub_date': obj.pub_date.isoformat(),
+        'updated_at': obj.updated_at.isoformat(),
+        'author': obj.author.username,
+        'group': obj.group.slug if obj.group_id else None,
+        'image': obj.image.url if obj.image else None,
+        'comment_count': obj.comment_count,
+    }, fields)
+
+
+def comment(obj, fields=COMMENT_FIELDS):
+    return _select({
+        'id': obj.pk,
+        'post': obj.post_id,
+        'author': obj.author.username,
+        'text': obj.text,
+        'created': obj.created.isoformat(),
+    }, fields)
+
+
+def group(obj, fields=GROUP_FIELDS):
+    return _select({
+        'slug': obj.slug,
+        'title': obj.title,
+        'description': obj.description,
+    }, fields)
+
+
+def profile(user, fields=PROFILE_FIELDS):
+    stats = counters.get_stats(user)
+    return _select({
+        'username': user.username,
+        'full_name': user.get_full_name(),
+        'post_count': stats.post_count,
+        'follower_count': stats.follower_count,
+        'following_count': stats.following_count,
+    }, fields)
+
+
+def page(page_obj, serialize, fields):
+    return {
+        'results': [serialize(obj, fields) for obj in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    }
@@ -0,0 +1,117 @@
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.http import Http404, JsonResponse
+
+from posts import cache, comments, feed, freshness
+from posts.models import Group, Post, User
+from posts.utils import get_cursor_page
+
+from . import serializers
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params={'separators': (',', ':'),
+                                           'ensure_ascii': False})
+
+
+def api_view(view):
+    """Только GET; ошибки отдаются в JSON, а не HTML-страницами."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_response({'detail': 'Метод не разрешён'}, 405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            return view(request, *args, **kwargs)
+        except Http404:
+            return json_response({'detail': 'Не найдено'}, 404)
+        except ValidationError as error:
+            return json_response({'detail': error.messages}, 400)
+    return wrapper
+
+
+def posts_page(request, posts):
+    fields = serializers.get_fields(request, serializers.POST_FIELDS)
+    page_obj = get_cursor_page(posts, request.GET.get('cursor'))
+    return json_response(
+        serializers.page(page_obj, serializers.post, fields))
+
+
+@api_view
+@freshness.conditional(freshness.index_state)
+def post_list(request):
+    return posts_page(request, Post.objects.select_related('author', 'group'))
+
+
+@api_view
+@freshness.conditional(freshness.post_state)
+def post_detail(request, post_id):
+    post = cache.get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    fields = serializers.get_fields(request,
+                                    serializers.POST_DETAIL_FIELDS)
+    return json_response(serializers.post(post, fields))
+
+
+@api_view
+@freshness.conditional(freshness.post_state)
+def post_comments(request, post_id):
+    post = cache.get_object_or_404(Post, pk=post_id)
+    fields = serializers.get_fields(request, serializers.COMMENT_FIELDS)
+    page_obj = comments.get_page(post, request.GET.get('cursor'))
+    return json_response(
+        serializers.page(page_obj, serializers.comment, fields))
+
+
+@api_view
+def group_list(request):
+    fields = serializers.get_fields(request, serializers.GROUP_FIELDS)
+    return json_response({'results': [
+        serializers.group(group, fields)
+        for group in Group.objects.order_by('title')
+    ]})
+
+
+@api_view
+@freshness.conditional(freshness.group_state)
+def group_posts(request, slug):
+    group = cache.get_object_or_404(Group, slug=slug)
+    return posts_page(request, group.posts.select_related('author', 'group'))
+
+
+@api_view
+@freshness.conditional(freshness.profile_state)
+def profile(request, username):
+    author = cache.get_object_or_404(User, username=username)
+    fields = serializers.get_fields(request, serializers.PROFILE_FIELDS)
+    return json_response(serializers.profile(author, fields))
+
+
+@api_view
+@freshness.conditional(freshness.profile_state)
+def profile_posts(request, username):
+    author = cache.get_object_or_404(User, username=username)
+    return posts_page(request,
+                      author.posts.select_related('author', 'group'))
+
+
+def login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return json_response({'detail': 'Нужна авторизация'}, 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@api_view
+@login_required
+@freshness.conditional(freshness.follow_state)
+def follow_feed(request):
+    fields = serializers.get_fields(request, serializers.POST_FIELDS)
+    page_obj = feed.get_follow_page(request.user, request, cursor=True)
+    return json_response(
+        serializers.page(page_obj, serializers.post, fields))
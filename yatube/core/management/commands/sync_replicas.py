@@ -0,0 +1,27 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик. Заменяет '
+            'репликацию при локальной проверке чтения с реплик.')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_READ_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте '
+                               'DATABASE_REPLICAS')
+        primary = connections['default']
+        if primary.vendor != 'sqlite':
+            raise CommandError('Команда копирует только базы SQLite')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_READ_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(settings.DATABASES[alias]['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f'{alias} обновлена'))
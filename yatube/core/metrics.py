@@ -0,0 +1,207 @@
+"""Метрики одного запроса: SQL, время шаблонов и обращения к кэшу.
+
+Счётчики копятся в ``RequestMetrics`` текущего потока, пока запрос идёт
+через ``core.middleware.MetricsMiddleware``. Запросы к базе перехватываются
+``connection.execute_wrapper``, время шаблонов — обёрткой над
+``Template.render`` бэкендов Django и Jinja2, а попадания в кэш — обёрткой над
+``get`` экземпляра кэша текущего потока. Вне запроса обёртки ничего не
+делают.
+"""
+import json
+import logging
+import re
+import socket
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger('yatube.metrics')
+
+_local = threading.local()
+_MISS = object()
+
+# Литералы заменяются знаком «?», чтобы запросы, отличающиеся только
+# параметрами, имели одну форму.
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+# «:», «|» и «@» разделяют поля строки StatsD и не должны попадать в имя.
+_STATSD_RESERVED = re.compile(r'[:|@]')
+
+
+class QueryBudgetExceeded(Exception):
+    """Страница выполнила больше запросов, чем разрешает QUERY_BUDGETS."""
+
+
+def query_shape(sql):
+    """Форма запроса без значений параметров."""
+    sql = _LITERALS.sub('?', sql.replace('%s', '?'))
+    return _IN_LISTS.sub('(?...)', ' '.join(sql.split()))
+
+
+class RequestMetrics:
+    def __init__(self, view_name=''):
+        self.view_name = view_name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.shapes = Counter()
+        self._template_depth = 0
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def repeated_queries(self, threshold=None):
+        """Формы запросов, выполненные не меньше threshold раз (N+1)."""
+        threshold = threshold or settings.METRICS_REPEATED_QUERY_THRESHOLD
+        return {shape: count for shape, count in self.shapes.items()
+                if count >= threshold}
+
+    def as_dict(self):
+        return {
+            'view': self.view_name,
+            'duration_ms': round(self.duration * 1000, 3),
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 3),
+            'template_ms': round(self.template_time * 1000, 3),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'repeated_queries': self.repeated_queries(),
+        }
+
+
+def current():
+    """Метрики запроса, который обрабатывает текущий поток, или None."""
+    return getattr(_local, 'metrics', None)
+
+
+def start(view_name=''):
+    _local.metrics = RequestMetrics(view_name)
+    _instrument_caches()
+    return _local.metrics
+
+
+def stop():
+    metrics = current()
+    _local.metrics = None
+    if metrics is not None:
+        metrics.finish()
+    return metrics
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка для ``connection.execute_wrapper``."""
+    metrics = current()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.queries += 1
+        metrics.shapes[query_shape(sql)] += 1
+
+
+def _timed_render(render):
+    def wrapper(self, *args, **kwargs):
+        metrics = current()
+        if metrics is None or metrics._template_depth:
+            # Вложенные шаблоны уже учтены во времени внешнего.
+            return render(self, *args, **kwargs)
+        metrics._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics._template_depth -= 1
+            metrics.template_time += time.perf_counter() - started
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def _template_classes():
+    yield django_backend.Template
+    if settings.JINJA2_INSTALLED:
+        from django.template.backends import jinja2 as jinja2_backend
+        yield jinja2_backend.Template
+
+
+def instrument_templates():
+    for template_class in _template_classes():
+        if not getattr(template_class.render, 'metrics_wrapped', False):
+            template_class.render = _timed_render(template_class.render)
+
+
+def _counted_get(get):
+    def wrapper(key, default=None, version=None):
+        value = get(key, _MISS, version=version)
+        metrics = current()
+        if metrics is not None:
+            if value is _MISS:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _MISS else value
+    wrapper.metrics_wrapped = True
+    return wrapper
+
+
+def _instrument_caches():
+    # Экземпляры кэшей у каждого потока свои, поэтому оборачиваются они,
+    # а не классы бэкендов.
+    for alias in settings.CACHES:
+        backend = caches[alias]
+        if not getattr(backend.get, 'metrics_wrapped', False):
+            backend.get = _counted_get(backend.get)
+
+
+class StatsdSink:
+    """Отправка метрик по UDP в формате StatsD, без ожидания ответа."""
+
+    def __init__(self, address, prefix='yatube'):
+        host, _, port = address.rpartition(':')
+        self.address = (host or 'localhost', int(port))
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+    def emit(self, metrics):
+        view_name = _STATSD_RESERVED.sub('.', metrics.view_name or 'unknown')
+        name = f'{self.prefix}.{view_name}'
+        data = metrics.as_dict()
+        lines = [
+            f'{name}.duration:{data["duration_ms"]}|ms',
+            f'{name}.db:{data["db_ms"]}|ms',
+            f'{name}.template:{data["template_ms"]}|ms',
+            f'{name}.queries:{data["queries"]}|h',
+            f'{name}.cache_hits:{data["cache_hits"]}|c',
+            f'{name}.cache_misses:{data["cache_misses"]}|c',
+            f'{name}.repeated_queries:{len(data["repeated_queries"])}|c',
+        ]
+        try:
+            self.socket.sendto('\n'.join(lines).encode(), self.address)
+        except OSError:
+            logger.debug('StatsD недоступен: %s', self.address)
+
+
+class LogSink:
+    """Одна строка JSON на запрос в логгер ``yatube.metrics``."""
+
+    def emit(self, metrics):
+        data = metrics.as_dict()
+        level = logging.WARNING if data['repeated_queries'] else logging.INFO
+        logger.log(level, json.dumps(data, ensure_ascii=False))
+
+
+def get_sink():
+    if settings.METRICS_SINK == 'statsd':
+        return StatsdSink(settings.METRICS_STATSD_ADDRESS)
+    return LogSink()
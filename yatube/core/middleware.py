@@ -0,0 +1,98 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics, routers
+
+
+class MetricsMiddleware:
+    """Считает запросы к базе, время шаблонов и кэш для каждого запроса.
+
+    Собранные метрики доступны тестам как ``response.metrics`` и уходят в
+    приёмник из ``settings.METRICS_SINK``. Превышение бюджета запросов из
+    ``settings.QUERY_BUDGETS`` и повторяющиеся формы запросов (N+1)
+    записываются в лог как предупреждения, а превышение бюджета при
+    ``settings.QUERY_BUDGET_STRICT`` поднимает ``QueryBudgetExceeded``.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sink = metrics.get_sink()
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        request_metrics = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.query_wrapper))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        match = request.resolver_match
+        request_metrics.view_name = match.view_name if match else ''
+        response.metrics = request_metrics
+        self.check_budget(request_metrics)
+        self.sink.emit(request_metrics)
+        return response
+
+    def check_budget(self, request_metrics):
+        budget = settings.QUERY_BUDGETS.get(request_metrics.view_name)
+        if budget is None or request_metrics.queries <= budget:
+            return
+        message = (f'{request_metrics.view_name}: '
+                   f'{request_metrics.queries} SQL-запросов при бюджете '
+                   f'{budget}')
+        if settings.QUERY_BUDGET_STRICT:
+            raise metrics.QueryBudgetExceeded(message)
+        metrics.logger.warning(message)
+
+
+class ReplicaRoutingMiddleware:
+    """Направляет чтения страниц на реплики, пока пользователь не писал.
+
+    После записи ставится cookie со сроком ``REPLICA_STICKY_SECONDS``: до
+    его истечения все запросы пользователя читают основную базу.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_READ_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset_writes()
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.release_replica()
+        if routers.has_written():
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE,
+                str(int(time.time()) + settings.REPLICA_STICKY_SECONDS),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name
+                in settings.REPLICA_READ_VIEWS
+                and not self.is_sticky(request)):
+            # реплика остаётся выбранной до конца запроса, вместе с
+            # рендером TemplateResponse
+            routers.use_replica()
+
+    @staticmethod
+    def is_sticky(request):
+        try:
+            until = int(request.COOKIES[settings.REPLICA_STICKY_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return until > time.time()
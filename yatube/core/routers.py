@@ -0,0 +1,73 @@
+"""Чтение с реплик, запись в основную базу.
+
+Реплики используются только после ``use_replica()``: его вызывает
+``core.middleware.ReplicaRoutingMiddleware`` для GET-запросов к страницам
+из ``settings.REPLICA_READ_VIEWS``. Любая запись помечает запрос, чтобы
+middleware на короткое время закрепил пользователя за основной базой и он
+сразу видел свои изменения, даже если реплика отстаёт.
+
+Реплика может отставать и от других пользователей, поэтому прочитанное с
+неё не кладётся в общий кэш: ``reading_replica()`` говорит кэшам, что
+результат можно хранить только до конца запроса, в ``replica_values()``.
+Таблица ``DatabaseCache`` всегда читается и пишется в основной базе, и
+запись в кэш не закрепляет пользователя за ней.
+"""
+import random
+import threading
+
+from django.conf import settings
+
+_state = threading.local()
+
+# app_label модели, через которую DatabaseCache спрашивает роутер.
+CACHE_APP_LABEL = 'django_cache'
+
+
+def use_replica():
+    """Читать с одной реплики, выбранной до ``release_replica()``."""
+    if settings.DATABASE_READ_REPLICAS:
+        _state.replica = random.choice(settings.DATABASE_READ_REPLICAS)
+        _state.values = {}
+
+
+def release_replica():
+    _state.replica = None
+    _state.values = {}
+
+
+def reading_replica():
+    """Читает ли текущий поток реплику, которая может отставать."""
+    return getattr(_state, 'replica', None) is not None
+
+
+def replica_values():
+    """Кэш прочитанного с реплики, живущий до ``release_replica()``."""
+    return _state.values
+
+
+def reset_writes():
+    _state.wrote = False
+
+
+def has_written():
+    return getattr(_state, 'wrote', False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return 'default'
+        return getattr(_state, 'replica', None) or 'default'
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != CACHE_APP_LABEL:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики хранят копию тех же таблиц.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплики и прямое соединение для выгрузок смотрят в ту же базу.
+        return db == 'default'
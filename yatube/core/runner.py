@@ -0,0 +1,56 @@
+"""Запуск тестов проекта."""
+from django.conf import settings
+from django.template import Context
+from django.test.runner import DiscoverRunner
+from django.test.signals import template_rendered
+from django.test.utils import override_settings
+
+
+class RenderedContext(Context):
+    """Контекст для ``response.context`` тестового клиента.
+
+    Шаблон Jinja2 отправляет один сигнал на страницу, и клиент отдаёт
+    контекст как есть, а не ``ContextList``; ``keys`` делает их похожими.
+    """
+
+    def keys(self):
+        return self.flatten().keys()
+
+
+def instrumented_jinja2_render(self, *args, **kwargs):
+    """Рендер Jinja2 с сигналом ``template_rendered``.
+
+    Как ``instrumented_test_render`` для шаблонов Django: сигнал собирает
+    ``response.context`` тестового клиента.
+    """
+    context = dict(*args, **kwargs)
+    template_rendered.send(sender=self, template=self,
+                           context=RenderedContext(context))
+    return self._original_render(context)
+
+
+class TestRunner(DiscoverRunner):
+    """``DiscoverRunner`` с метриками запросов и строгими бюджетами.
+
+    Под тестами ``MetricsMiddleware`` включена всегда, а превышение
+    ``QUERY_BUDGETS`` роняет запрос, а не пишет предупреждение в лог.
+    Шаблоны Jinja2, как и шаблоны Django, шлют ``template_rendered``.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._metrics_settings = override_settings(
+            METRICS_ENABLED=True, QUERY_BUDGET_STRICT=True)
+        self._metrics_settings.enable()
+        if settings.JINJA2_INSTALLED:
+            from yatube.jinja2 import Template
+            Template._original_render = Template.render
+            Template.render = instrumented_jinja2_render
+
+    def teardown_test_environment(self, **kwargs):
+        if settings.JINJA2_INSTALLED:
+            from yatube.jinja2 import Template
+            Template.render = Template._original_render
+            del Template._original_render
+        self._metrics_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,7 @@
+"""Нагрузочные прогоны приложения posts, по модулю на подсистему.
+
+``pages`` — страницы через тестовый клиент, ``database`` — параллельная
+нагрузка на базу, ``render`` — рендер карточек постов, ``graph`` — граф
+подписок в памяти, ``suggestions`` — расчёт рекомендаций. ``utils.compare``
+сверяет отчёт любого из них с сохранённым базовым JSON.
+"""
@@ -0,0 +1,83 @@
+"""Параллельные чтения ленты и записи комментариев и подписок.
+
+Прогон сравнивает профили баз под конкурентной записью.
+"""
+import random
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+
+from ..models import Comment, Follow, Post
+from .utils import summarize
+
+User = get_user_model()
+
+
+def _read(rng, post_ids, user_ids):
+    list(Post.objects.select_related('author', 'group')
+         .filter(pk__lte=rng.choice(post_ids))[:10])
+
+
+def _write(rng, post_ids, user_ids):
+    user_id, author_id = rng.sample(user_ids, 2)
+    if rng.random() < 0.5:
+        Comment.objects.create(post_id=rng.choice(post_ids),
+                               author_id=user_id, text='Нагрузка')
+        return
+    follow, created = Follow.objects.get_or_create(
+        user_id=user_id, author_id=author_id)
+    if not created:
+        follow.delete()
+
+
+def run_concurrent(threads=8, duration=5.0, write_ratio=0.3,
+                   random_seed=0):
+    """Параллельные чтения и записи из threads потоков.
+
+    Возвращает для чтений и записей перцентили задержки, число операций в
+    секунду и число ошибок базы (например, «database is locked»).
+    """
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    samples = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(number):
+        rng = random.Random(random_seed + number)
+        try:
+            while time.perf_counter() < deadline:
+                kind = 'write' if rng.random() < write_ratio else 'read'
+                operation = _write if kind == 'write' else _read
+                started = time.perf_counter()
+                try:
+                    operation(rng, post_ids, user_ids)
+                except OperationalError:
+                    with lock:
+                        errors[kind] += 1
+                    continue
+                elapsed = time.perf_counter() - started
+                with lock:
+                    samples[kind].append((elapsed, 0, 0))
+        finally:
+            connection.close()
+
+    workers = [threading.Thread(target=worker, args=(number,))
+               for number in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    report = {}
+    for kind, kind_samples in samples.items():
+        if not kind_samples:
+            continue
+        summary = summarize(kind_samples)
+        del summary['queries'], summary['bytes']
+        summary['per_second'] = round(len(kind_samples) / duration, 1)
+        summary['errors'] = errors[kind]
+        report[f'concurrent_{kind}'] = summary
+    return report
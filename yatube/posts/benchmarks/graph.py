@@ -0,0 +1,68 @@
+"""Память на ребро и время операций графа подписок ``posts.graph``."""
+import random
+import time
+
+from .. import graph
+from .utils import percentile, power_law_weights
+
+GRAPH_EDGES = 10 ** 7
+
+
+def follow_pairs(edges, users=None, exponent=1.1, random_seed=0):
+    """Пары (пользователь, автор) по порядку, авторы по закону Ципфа."""
+    users = users or max(2, edges // 100)
+    per_user = min(edges // users, users - 1)
+    rng = random.Random(random_seed)
+    ids = range(1, users + 1)
+    weights = power_law_weights(users, exponent)
+    for user_id in ids:
+        authors = set()
+        while len(authors) < per_user:
+            authors.update(rng.choices(ids, cum_weights=weights,
+                                       k=per_user - len(authors)))
+            authors.discard(user_id)
+        for author_id in sorted(authors):
+            yield user_id, author_id
+
+
+def _time_us(operation, arguments):
+    timings = []
+    for argument in arguments:
+        started = time.perf_counter()
+        operation(*argument)
+        timings.append(time.perf_counter() - started)
+    return {f'p{percent}_us': round(percentile(timings, percent) * 1e6, 1)
+            for percent in (50, 99)}
+
+
+def run_graph(edges=GRAPH_EDGES, users=None, samples=1000, random_seed=0):
+    """Память и скорость графа подписок на edges рёбрах."""
+    started = time.perf_counter()
+    follow_graph = graph.FollowGraph.from_pairs(
+        follow_pairs(edges, users, random_seed=random_seed))
+    built = time.perf_counter() - started
+    report = {'graph_build': {
+        'edges': follow_graph.edges,
+        'seconds': round(built, 1),
+        'bytes_per_edge': round(follow_graph.nbytes / follow_graph.edges, 2),
+    }}
+    rng = random.Random(random_seed)
+    size = len(follow_graph.following_rows.offsets) - 1
+    nodes = [rng.randrange(1, size) for _ in range(samples)]
+    pairs = [(rng.randrange(1, size), rng.randrange(1, size))
+             for _ in range(samples)]
+    operations = {
+        'is_following': (follow_graph.is_following, pairs),
+        'following': (follow_graph.following, [(node,) for node in nodes]),
+        'followers': (follow_graph.followers, [(node,) for node in nodes]),
+        'mutuals': (follow_graph.mutuals, [(node,) for node in nodes]),
+        'common_following': (follow_graph.common_following, pairs),
+        'friends_of_friends': (
+            follow_graph.friends_of_friends,
+            [(node, 10) for node in nodes[:max(1, samples // 10)]]),
+        'follow': (follow_graph.apply,
+                   [(*pair, True) for pair in pairs]),
+    }
+    for name, (operation, arguments) in operations.items():
+        report[f'graph_{name}'] = _time_us(operation, arguments)
+    return report
@@ -0,0 +1,141 @@
+"""Прогон страниц posts через тестовый клиент Django.
+
+``seed`` наполняет базу синтетическими данными: авторство постов и
+подписки распределены по степенному закону, как в настоящей соцсети, где
+немногие авторы собирают большую часть подписчиков. ``run`` прогоняет
+каждый сценарий и для каждого запроса записывает время, число
+SQL-запросов и размер ответа.
+"""
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from faker import Faker
+from mixer.backend.django import mixer
+
+from .. import counters, feed, search
+from ..models import Comment, Follow, Group, Post
+from ..utils import batched
+from .utils import power_law_weights, summarize
+
+User = get_user_model()
+
+SCENARIOS = ('index', 'group_posts', 'profile', 'post_detail',
+             'follow_index', 'add_comment')
+
+
+def seed(posts=1000, users=100, groups=10, follows_per_user=20,
+         comments=None, exponent=1.1, batch_size=1000, random_seed=0):
+    """Заполнить базу синтетическими пользователями, постами и подписками.
+
+    Сигналы при ``bulk_create`` не срабатывают, поэтому ленты, счётчики и
+    поисковый индекс в конце пересчитываются целиком.
+    """
+    rng = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    texts = [fake.paragraph(nb_sentences=3) for _ in range(500)]
+
+    # размер пачки внутри bulk_create выбирает сам Django: SQLite
+    # ограничивает число строк в одном INSERT
+    User.objects.bulk_create(
+        [User(username=f'user{number}') for number in range(users)])
+    user_ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    weights = power_law_weights(len(user_ids), exponent)
+    mixer.cycle(groups).blend(Group, slug=mixer.sequence('group{0}'))
+    group_ids = [None] + list(Group.objects.values_list('pk', flat=True))
+
+    for batch in batched(range(posts), batch_size):
+        Post.objects.bulk_create([
+            Post(text=rng.choice(texts),
+                 author_id=rng.choices(user_ids, cum_weights=weights)[0],
+                 group_id=rng.choice(group_ids))
+            for _ in batch])
+
+    follows = set()
+    for user_id in user_ids:
+        for author_id in rng.choices(user_ids, cum_weights=weights,
+                                     k=follows_per_user):
+            if author_id != user_id:
+                follows.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in follows])
+
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    for batch in batched(range(comments or posts // 2), batch_size):
+        Comment.objects.bulk_create([
+            Comment(post_id=rng.choice(post_ids),
+                    author_id=rng.choice(user_ids),
+                    text=rng.choice(texts))
+            for _ in batch])
+
+    counters.rebuild(batch_size=batch_size)
+    feed.rebuild()
+    if search.is_available():
+        search.rebuild(batch_size=batch_size)
+    cache.clear()
+
+
+class Targets:
+    """Случайные, но воспроизводимые адреса для сценариев."""
+
+    def __init__(self, random_seed=0):
+        self.rng = random.Random(random_seed)
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(User.objects.order_by('pk').values_list(
+            'username', flat=True)[:1000])
+        self.post_ids = list(Post.objects.order_by('-pk').values_list(
+            'pk', flat=True)[:1000])
+        self.readers = list(User.objects.filter(
+            follower__isnull=False).distinct()[:100])
+
+    def prepare(self, scenario, client):
+        """Войти при необходимости и вернуть (метод, адрес, данные)."""
+        rng = self.rng
+        if scenario == 'index':
+            return 'get', reverse('posts:index'), None
+        if scenario == 'group_posts':
+            return 'get', reverse('posts:group_list',
+                                  args=[rng.choice(self.slugs)]), None
+        if scenario == 'profile':
+            return 'get', reverse('posts:profile',
+                                  args=[rng.choice(self.usernames)]), None
+        if scenario == 'post_detail':
+            return 'get', reverse('posts:post_detail',
+                                  args=[rng.choice(self.post_ids)]), None
+        client.force_login(rng.choice(self.readers))
+        if scenario == 'follow_index':
+            return 'get', reverse('posts:follow_index'), None
+        return ('post',
+                reverse('posts:add_comment',
+                        args=[rng.choice(self.post_ids)]),
+                {'text': 'Комментарий из нагрузочного теста'})
+
+
+def run(scenarios=SCENARIOS, requests=100, warmup=5, random_seed=0):
+    """Прогнать сценарии и вернуть {сценарий: сводка}; время — в мс."""
+    targets = Targets(random_seed)
+    report = {}
+    for scenario in scenarios:
+        client = Client()
+        samples = []
+        for number in range(warmup + requests):
+            method, url, data = targets.prepare(scenario, client)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError(
+                    f'{scenario}: ответ {response.status_code}')
+            if number >= warmup:
+                samples.append(
+                    (elapsed, len(queries), len(response.content)))
+        report[scenario] = summarize(samples)
+    return report
@@ -0,0 +1,71 @@
+"""Рендер карточек постов через ``{% include %}`` и через ``posts.cards``."""
+import time
+
+from django.template import Context, engines
+
+from ..models import Post
+from .utils import percentile
+
+RENDER_COUNTS = (10, 100, 1000)
+
+# карточка ленты в прежнем виде: url, get_full_name и include на каждую
+LEGACY_CARD = '''{% load thumbnail %}
+<article>
+  <ul>
+    <li>
+      Автор: {% if post.author.get_full_name %}
+        {{ post.author.get_full_name }}
+      {% else %}
+        {{ post.author }}
+      {% endif %}
+      <a href="{% url 'posts:profile' post.author.username %}">
+        Все посты пользователя
+      </a>
+    </li>
+    {% if post.group %}
+    <li>
+      Группа: {{ post.group.title }}
+      <a href="{% url 'posts:group_list' post.group.slug %}">
+        Все записи группы
+      </a>
+    </li>
+    {% endif %}
+    <li>
+      Дата публикации: {{ post.pub_date|date:"d E Y" }}
+    </li>
+  </ul>
+  {% include 'includes/post_image.html' %}
+  <p>{{ post.text|linebreaks }}</p>
+  <a href="{% url 'posts:post_detail' post.id %}">Подробная информация</a>
+</article>
+'''
+
+
+def run_render(counts=RENDER_COUNTS, repeat=20):
+    """Медианное время рендера N карточек, мс: include и posts.cards."""
+    engine = engines['django'].engine
+    renderers = {
+        'include': engine.from_string(
+            '{% for post in posts %}{% include card %}{% endfor %}'),
+        'cards': engine.from_string(
+            '{% load post_cards %}'
+            '{% for card in posts|post_cards %}{{ card }}{% endfor %}'),
+    }
+    card = engine.from_string(LEGACY_CARD)
+    posts = list(Post.objects.select_related('author', 'group')
+                 [:max(counts)])
+    report = {}
+    for count in counts:
+        context = {'posts': posts[:count], 'card': card}
+        row = {}
+        for name, template in renderers.items():
+            template.render(Context(context))
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                template.render(Context(context))
+                timings.append(time.perf_counter() - started)
+            row[name] = round(percentile(timings, 50) * 1000, 2)
+        row['speedup'] = round(row['include'] / row['cards'], 1)
+        report[f'cards_{len(context["posts"])}'] = row
+    return report
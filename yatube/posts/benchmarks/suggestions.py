@@ -0,0 +1,20 @@
+"""Время расчёта рекомендаций ``posts.suggestions``."""
+import time
+
+from .. import suggestions
+from .graph import GRAPH_EDGES, follow_pairs
+
+
+def run_suggestions(edges=GRAPH_EDGES, users=None, top_k=10,
+                    random_seed=0):
+    """Время расчёта рекомендаций на edges синтетических рёбрах."""
+    follows = suggestions.follow_matrix(
+        follow_pairs(edges, users, random_seed=random_seed))
+    started = time.perf_counter()
+    rows = sum(len(block[0])
+               for block in suggestions.suggest(follows, top_k))
+    return {'suggestions_build': {
+        'edges': follows.nnz,
+        'seconds': round(time.perf_counter() - started, 1),
+        'rows': rows,
+    }}
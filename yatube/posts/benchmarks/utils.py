@@ -0,0 +1,61 @@
+"""Общие части нагрузочных прогонов: перцентили и сравнение отчётов."""
+from itertools import accumulate
+
+PERCENTILES = (50, 95, 99)
+# метрики, рост которых сверх допуска считается регрессией
+COMPARED = ('p50', 'p95', 'p99', 'queries', 'bytes', 'errors')
+
+
+def power_law_weights(count, exponent):
+    """Накопленные веса Ципфа: i-й элемент в i^exponent раз реже первого."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, count + 1)))
+
+
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * percent // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(samples):
+    """Свести замеры сценария к перцентилям и средним."""
+    timings = [sample[0] for sample in samples]
+    report = {f'p{percent}': round(percentile(timings, percent) * 1000, 3)
+              for percent in PERCENTILES}
+    report['requests'] = len(samples)
+    report['queries'] = round(
+        sum(sample[1] for sample in samples) / len(samples), 2)
+    report['bytes'] = round(
+        sum(sample[2] for sample in samples) / len(samples))
+    return report
+
+
+def compare(report, baseline, tolerance=0.2):
+    """Список регрессий отчёта относительно базового прогона.
+
+    Время и размер ответа могут вырасти не более чем на ``tolerance``,
+    число запросов и ошибок базы не должно расти совсем: оно не зависит от
+    шума машины. Сценарий или метрика базового прогона, которых нет в
+    отчёте, тоже попадают в список.
+    """
+    regressions = []
+    for scenario, base in baseline.items():
+        metrics = report.get(scenario)
+        if metrics is None:
+            regressions.append(f'{scenario}: нет в отчёте')
+            continue
+        for metric in COMPARED:
+            if metric not in base:
+                continue
+            if metric not in metrics:
+                regressions.append(f'{scenario}.{metric}: нет в отчёте')
+                continue
+            allowed = base[metric] * (
+                1 if metric in ('queries', 'errors') else 1 + tolerance)
+            if metrics[metric] > allowed:
+                regressions.append(
+                    f'{scenario}.{metric}: {metrics[metric]} '
+                    f'> {base[metric]}')
+    return regressions
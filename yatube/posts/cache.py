@@ -0,0 +1,194 @@
+"""Кэш лент, карточек постов и объектов, которые ищут views.
+
+Фрагменты шаблонов кэшируются на ``CACHE_FRAGMENT_TIMEOUT`` (в общем
+кэше — без срока жизни), а в ключ входит номер поколения своей области:
+всей ленты, группы, автора или поста. Запись в область увеличивает её
+поколение сразу и ещё раз после фиксации транзакции, и следующий читатель
+строит фрагмент заново, поэтому устаревший HTML не показывается.
+
+Группы, авторы и посты, которые views ищут по slug, username и pk, читаются
+через cache-aside и сбрасываются сигналами при записи: своих, а для постов
+ещё и при смене имени автора или названия группы, которые пост подгружает
+через ``select_related``.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import Http404
+
+from core import routers
+
+FEED = 'feed'
+GROUP = 'group'
+AUTHOR = 'author'
+POST = 'post'
+# подписки одного читателя: меняют состав его ленты
+FOLLOWS = 'follows'
+# рекомендации авторов: меняются целиком при пересчёте
+SUGGESTIONS = 'suggestions'
+
+
+def _key(scope, pk=None):
+    return f'gen:{scope}' if pk is None else f'gen:{scope}:{pk}'
+
+
+def _initial():
+    # Начальное поколение зависит от времени: если счётчик вытеснен из
+    # кэша, он не совпадёт ни с одним из прежних значений.
+    return time.time_ns() // 1000
+
+
+def get_version(scope, pk=None):
+    """Текущее поколение области."""
+    key = _key(scope, pk)
+    version = cache.get(key)
+    if version is None:
+        version = _initial()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def _after_commit(function, *args):
+    """Выполнить сейчас и ещё раз после фиксации текущей транзакции.
+
+    Пока транзакция пишущего не зафиксирована, читатель видит старые строки
+    и может положить их в кэш уже под новым поколением. Повторный вызов
+    после фиксации выводит такую запись из употребления.
+    """
+    function(*args)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: function(*args))
+
+
+def _bump(scopes):
+    now = time.time()
+    for scope, pk in scopes:
+        key = _key(scope, pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+        cache.set(f'{key}:at', now, None)
+
+
+def bump(*scopes):
+    """Сменить поколение областей; scopes — пары (область, pk)."""
+    _after_commit(_bump, scopes)
+
+
+def get_changed(scope, pk=None):
+    """Время последней смены поколения области, unix-время.
+
+    Если отметка вытеснена из кэша, изменением считается текущий момент:
+    лишний полный ответ лучше устаревшего 304.
+    """
+    key = f'{_key(scope, pk)}:at'
+    changed = cache.get(key)
+    if changed is None:
+        changed = time.time()
+        if not cache.add(key, changed, None):
+            changed = cache.get(key, changed)
+    return changed
+
+
+def post_scopes(post, group_id=None):
+    """Области, которые затрагивает запись поста."""
+    scopes = [(FEED, None), (AUTHOR, post.author_id), (POST, post.pk)]
+    for pk in {post.group_id, group_id} - {None}:
+        scopes.append((GROUP, pk))
+    return scopes
+
+
+_MISSING = object()
+
+
+def get_or_compute(key, compute, timeout=None):
+    """Cache-aside с защитой от «stampede».
+
+    Значение хранится дольше своего срока свежести. Когда срок вышел,
+    пересчёт выполняет только процесс, захвативший блокировку, а остальные
+    тем временем отдают прежнее значение. Прочитанное с отстающей
+    реплики хранится только до конца запроса.
+    """
+    timeout = timeout or settings.CACHE_ASIDE_TIMEOUT
+    entry = cache.get(key)
+    now = time.time()
+    if routers.reading_replica():
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        values = routers.replica_values()
+        if key not in values:
+            values[key] = compute()
+        return values[key]
+    if entry is not None:
+        value, fresh_until = entry
+        if fresh_until > now or not _lock(key):
+            return value
+    elif not _lock(key):
+        value = _wait_for(key)
+        if value is not _MISSING:
+            return value
+    try:
+        value = compute()
+        cache.set(key, (value, now + timeout), timeout * 2)
+    finally:
+        cache.delete(f'{key}:lock')
+    return value
+
+
+def _lock(key):
+    # Блокировка держится на атомарном add(): он атомарен в memcached и в
+    # таблице db, но не в file, где add() и incr() — чтение и запись без
+    # блокировки. С file пересчёт иногда выполняют несколько процессов
+    # сразу; это лишняя работа, а не устаревшие данные.
+    return cache.add(f'{key}:lock', 1, settings.CACHE_LOCK_TIMEOUT)
+
+
+def _wait_for(key):
+    """Подождать, пока значение посчитает процесс с блокировкой."""
+    deadline = time.time() + settings.CACHE_LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return _MISSING
+
+
+def _object_scope(model, field, value):
+    # slug и username бывают не ASCII, а memcached принимает только ASCII.
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'obj:{model._meta.label_lower}:{field}', digest
+
+
+def get_object_or_404(queryset, **lookup):
+    """Закэшированный ``get_object_or_404`` по одному полю.
+
+    В ключ входят форма запроса (``select_related``) и поколение объекта:
+    ``forget_object`` меняет поколение, и все формы читаются заново.
+    """
+    if hasattr(queryset, '_default_manager'):
+        queryset = queryset._default_manager.all()
+    [(field, value)] = lookup.items()
+    scope, digest = _object_scope(queryset.model, field, value)
+    shape = hashlib.md5(json.dumps(
+        queryset.query.select_related, sort_keys=True).encode()).hexdigest()
+    obj = get_or_compute(
+        f'{scope}:{digest}:{shape}:{get_version(scope, digest)}',
+        lambda: queryset.filter(**lookup).first(),
+    )
+    if obj is None:
+        raise Http404(f'No {queryset.model._meta.object_name} matches '
+                      'the given query.')
+    return obj
+
+
+def forget_object(model, field, *values):
+    """Сбросить закэшированные объекты после записи."""
+    bump(*(_object_scope(model, field, value) for value in values
+           if value is not None))
@@ -0,0 +1,44 @@
+"""Постраничная выдача комментариев к посту, новые первыми.
+
+Страницы листаются курсором по ``(created, id)`` по индексу
+``comment_post_created_idx``, авторы выбираются тем же запросом. Первая
+страница кэшируется до следующей записи в область поста: новый или
+удалённый комментарий меняет поколение, и страница строится заново.
+"""
+from django.conf import settings
+from django.urls import reverse
+
+from . import cache
+from .utils import get_cursor_page
+
+
+def get_page(post, cursor=None):
+    """Страница комментариев поста; первая берётся из кэша."""
+    comments = post.comments.select_related('author')
+
+    def compute():
+        return get_cursor_page(comments, cursor,
+                               settings.COMMENTS_PER_PAGE, field='created')
+
+    if cursor:
+        return compute()
+    version = cache.get_version(cache.POST, post.pk)
+    return cache.get_or_compute(f'comments:{post.pk}:{version}', compute)
+
+
+def serialize(page):
+    """Страница комментариев для JSON-ответа."""
+    return {
+        'results': [
+            {
+                'id': comment.pk,
+                'author': comment.author.username,
+                'author_url': reverse('posts:profile',
+                                      args=[comment.author.username]),
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in page
+        ],
+        'next_cursor': page.next_cursor,
+    }
@@ -0,0 +1,79 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарным ``UPDATE ... SET x = x + 1`` при записи,
+поэтому страницы лент не выполняют ``COUNT(*)`` на каждую строку.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Post
+from .utils import batched
+
+User = get_user_model()
+
+
+def _count(queryset, field):
+    """Подзапрос с количеством строк queryset на каждое значение field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def _annotate_stats(users):
+    return users.annotate(
+        post_n=_count(Post.objects.all(), 'author'),
+        follower_n=_count(Follow.objects.all(), 'author'),
+        following_n=_count(Follow.objects.all(), 'user'),
+    )
+
+
+def get_stats(user):
+    """Счётчики автора; недостающая строка считается с нуля."""
+    try:
+        return user.stats
+    except AuthorStats.DoesNotExist:
+        pass
+    user = _annotate_stats(User.objects.filter(pk=user.pk)).get()
+    stats, _ = AuthorStats.objects.get_or_create(
+        user=user,
+        defaults={'post_count': user.post_n,
+                  'follower_count': user.follower_n,
+                  'following_count': user.following_n},
+    )
+    return stats
+
+
+def bump_stats(user_id, created, **deltas):
+    """Изменить счётчики автора на deltas.
+
+    Удаления только уменьшают существующую строку: при каскадном удалении
+    пользователя создавать для него статистику нельзя.
+    """
+    updated = AuthorStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+    if not updated and created:
+        get_stats(User(pk=user_id))
+
+
+def bump_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F('comment_count') + delta)
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """Пересчитать все счётчики по исходным таблицам."""
+    Post.objects.update(
+        comment_count=_count(Comment.objects.all(), 'post'))
+    AuthorStats.objects.all().delete()
+    users = _annotate_stats(User.objects.order_by('pk'))
+    stats = (AuthorStats(user_id=user.pk,
+                         post_count=user.post_n,
+                         follower_count=user.follower_n,
+                         following_count=user.following_n)
+             for user in users.iterator())
+    for batch in batched(stats, batch_size):
+        AuthorStats.objects.bulk_create(batch)
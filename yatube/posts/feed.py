@@ -0,0 +1,176 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Каждый подписчик получает собственные строки ``FeedEntry``, поэтому
+страница ``follow_index`` читает одну страницу готовых записей по индексу
+``(user, -pub_date)`` без join по ``Follow``. Для авторов с большим числом
+подписчиков запись не размножается: их посты подмешиваются при чтении
+(гибридный fan-out on read). Когда автор теряет подписчиков и снова
+становится «лёгким», его посты раскладываются по лентам всех подписчиков
+одним запросом, иначе написанное им в «тяжёлое» время пропало бы из
+лент. С ``FOLLOW_GRAPH_ENABLED`` подписчики и
+их число берутся из графа подписок ``posts.graph``.
+"""
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+
+from . import counters, graph
+from .models import AuthorStats, FeedEntry, Follow, Post
+from .utils import batched, get_merged_paginator, get_paginator
+
+
+def is_heavy_author(author_id):
+    """Автор, посты которого не размножаются по лентам подписчиков."""
+    if settings.FOLLOW_GRAPH_ENABLED:
+        return (graph.get_graph().follower_count(author_id)
+                >= settings.FEED_FANOUT_LIMIT)
+    return AuthorStats.objects.filter(
+        user_id=author_id,
+        follower_count__gte=settings.FEED_FANOUT_LIMIT).exists()
+
+
+def heavy_authors(user):
+    """id «тяжёлых» авторов, на которых подписан пользователь."""
+    if settings.FOLLOW_GRAPH_ENABLED:
+        follows = graph.get_graph()
+        return [author_id for author_id in follows.following(user.pk)
+                if follows.follower_count(author_id)
+                >= settings.FEED_FANOUT_LIMIT]
+    return list(
+        AuthorStats.objects.filter(
+            user_id__in=Follow.objects.filter(user=user).values('author'),
+            follower_count__gte=settings.FEED_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def _create_entries(entries):
+    for batch in batched(entries, settings.FEED_BATCH_SIZE):
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Разложить новый пост по лентам подписчиков автора."""
+    if is_heavy_author(post.author_id):
+        return
+    if settings.FOLLOW_GRAPH_ENABLED:
+        followers = graph.get_graph().followers(post.author_id)
+    else:
+        followers = Follow.objects.filter(
+            author_id=post.author_id).values_list(
+                'user_id', flat=True).iterator()
+    _create_entries(
+        FeedEntry(user_id=user_id, post_id=post.pk,
+                  author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавить в ленту пользователя посты автора после подписки."""
+    if is_heavy_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id).values_list('pk', 'pub_date')
+    _create_entries(
+        FeedEntry(user_id=user_id, post_id=pk,
+                  author_id=author_id, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def _insert_entries(cursor, select, params):
+    """``INSERT ... SELECT`` в ленты, пропуская уже существующие строки."""
+    ops = connection.ops
+    cursor.execute(
+        f'{ops.insert_statement(ignore_conflicts=True)} '
+        f'{FeedEntry._meta.db_table} (user_id, post_id, author_id, pub_date) '
+        f'{select} {ops.ignore_conflicts_suffix_sql(ignore_conflicts=True)}',
+        params,
+    )
+
+
+def fill_author(author_id):
+    """Разложить все посты автора по лентам всех его подписчиков."""
+    with connection.cursor() as cursor:
+        _insert_entries(
+            cursor,
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {Post._meta.db_table} p '
+            f'JOIN {Follow._meta.db_table} f ON f.author_id = p.author_id '
+            'WHERE p.author_id = %s',
+            [author_id],
+        )
+
+
+def remove_follower(author_id):
+    """Уменьшить число подписчиков автора после отписки.
+
+    Условный ``UPDATE`` срабатывает ровно у той отписки, которая опустила
+    счётчик ниже ``FEED_FANOUT_LIMIT``, даже при параллельных отписках:
+    она и раскладывает посты автора, не попавшие в ленты.
+    """
+    crossed = AuthorStats.objects.filter(
+        user_id=author_id, follower_count=settings.FEED_FANOUT_LIMIT,
+    ).update(follower_count=F('follower_count') - 1)
+    if crossed:
+        fill_author(author_id)
+    else:
+        counters.bump_stats(author_id, False, follower_count=-1)
+
+
+def remove_author(user_id, author_id):
+    """Убрать посты автора из ленты пользователя после отписки."""
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild():
+    """Заново заполнить ленты всех пользователей.
+
+    Строки переносятся одним ``INSERT ... SELECT`` внутри базы: на
+    миллионах постов создание объектов ``FeedEntry`` в Python занимает
+    минуты. Порядок уникального ключа (user, post) дописывает его индекс
+    в конец, а не вставляет в середину: на миллионах строк это на
+    четверть быстрее.
+    """
+    FeedEntry.objects.all().delete()
+    tables = {model.__name__: model._meta.db_table
+              for model in (AuthorStats, FeedEntry, Follow, Post)}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {tables["FeedEntry"]} '
+            '(user_id, post_id, author_id, pub_date) '
+            'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+            f'FROM {tables["Post"]} p '
+            f'JOIN {tables["Follow"]} f ON f.author_id = p.author_id '
+            f'LEFT JOIN {tables["AuthorStats"]} s '
+            'ON s.user_id = p.author_id '
+            'WHERE COALESCE(s.follower_count, 0) < %s '
+            'ORDER BY f.user_id, p.id',
+            [settings.FEED_FANOUT_LIMIT],
+        )
+
+
+def get_follow_page(user, request, cursor=None):
+    """Страница ленты подписок пользователя.
+
+    Посты «тяжёлых» авторов читаются отдельной страницей на автора по
+    индексу ``(author, pub_date)`` и сливаются со страницей ``FeedEntry``
+    по ключу ``(pub_date, pk поста)``; этот же ключ хранит курсор.
+    """
+    heavy = heavy_authors(user)
+    entries = FeedEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group')
+    if heavy:
+        posts = Post.objects.select_related('author', 'group')
+        sources = [(entries.exclude(author_id__in=heavy), 'post_id')]
+        sources += [(posts.filter(author_id=author_id), 'pk')
+                    for author_id in heavy]
+        page_obj = get_merged_paginator(sources, request, cursor)
+    else:
+        page_obj = get_paginator(entries, request, cursor, key='post_id')
+    page_obj.object_list = [
+        row.post if isinstance(row, FeedEntry) else row
+        for row in page_obj.object_list
+    ]
+    return page_obj
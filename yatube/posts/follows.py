@@ -0,0 +1,83 @@
+"""Подписки текущего пользователя: один запрос на страницу.
+
+id авторов, на которых подписан пользователь, читаются одним запросом по
+индексу ``(user, author)`` и кэшируются упакованным массивом ``q`` по
+8 байт на автора. В ключ входит поколение области ``FOLLOWS``: сигналы
+``Follow``, которые срабатывают в ``profile_follow`` и
+``profile_unfollow``, меняют его, и набор читается заново. За запрос набор
+разбирается один раз и хранится на объекте запроса, поэтому кнопки
+подписки и карточки страницы проверяют подписку без запросов к базе. С
+``FOLLOW_GRAPH_ENABLED`` набор берётся из графа ``posts.graph``.
+
+Рекомендации авторов из ``posts.suggestions`` кэшируются так же, под
+поколением области ``SUGGESTIONS``, которое меняет их пересчёт.
+"""
+from array import array
+
+from django.conf import settings
+
+from . import cache, graph
+from .models import Follow, Suggestion
+
+
+def _load(user_id):
+    if settings.FOLLOW_GRAPH_ENABLED:
+        return frozenset(graph.get_graph().following(user_id))
+    version = cache.get_version(cache.FOLLOWS, user_id)
+
+    def compute():
+        ids = (Follow.objects.filter(user_id=user_id)
+               .order_by('author_id').values_list('author_id', flat=True))
+        return array('q', ids).tobytes()
+
+    packed = cache.get_or_compute(f'follows:{user_id}:{version}', compute)
+    followed = array('q')
+    followed.frombytes(packed)
+    return frozenset(followed)
+
+
+def _load_suggestions(user_id):
+    version = cache.get_version(cache.SUGGESTIONS)
+
+    def compute():
+        return [suggestion.author for suggestion in
+                Suggestion.objects.filter(user_id=user_id)
+                .select_related('author').order_by('-score')]
+
+    return cache.get_or_compute(f'suggestions:{user_id}:{version}', compute)
+
+
+class Following:
+    """Авторы, на которых подписан пользователь; набор читается лениво."""
+
+    def __init__(self, user):
+        self.user_id = user.pk if user.is_authenticated else None
+        self._ids = None
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            self._ids = (frozenset() if self.user_id is None
+                         else _load(self.user_id))
+        return self._ids
+
+    def is_following(self, author_id):
+        return author_id in self.ids
+
+    __contains__ = is_following
+
+    def suggested(self, limit=None):
+        """Рекомендованные авторы, на которых пользователь не подписан."""
+        if self.user_id is None:
+            return []
+        authors = [author for author in _load_suggestions(self.user_id)
+                   if author.pk not in self.ids]
+        return authors[:limit or settings.SUGGESTIONS_SHOWN]
+
+
+def for_request(request):
+    """Подписки посетителя, общие для всего запроса."""
+    following = getattr(request, '_following', None)
+    if following is None:
+        following = request._following = Following(request.user)
+    return following
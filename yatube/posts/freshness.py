@@ -0,0 +1,145 @@
+"""ETag и Last-Modified для лент без выборки страницы.
+
+ETag складывается из поколений областей кэша (``posts.cache``), которые
+меняет каждая запись поста, комментария или группы, и из адреса с
+параметрами. Last-Modified — время последней смены этих поколений, то есть
+последней публикации, правки или удаления в области. Оба валидатора
+читаются из кэша, и ``conditional`` отвечает 304, не обращаясь к базе и
+не вызывая view. Ответ, прочитанный с реплики, валидаторов не получает:
+реплика может отставать от поколений в кэше.
+
+HTML-страницы зависят ещё и от посетителя, поэтому ``page`` добавляет его
+к валидаторам и выставляет Cache-Control и Vary: Cookie, чтобы обратный
+прокси мог хранить анонимные страницы.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control, patch_vary_headers)
+from django.utils.http import http_date, quote_etag
+
+from core import routers
+
+from . import cache
+from .models import Group, Post, User
+
+
+class State:
+    """Валидаторы области: пары (область кэша, pk) и прочие части ETag."""
+
+    def __init__(self, scopes, *parts):
+        self.scopes = scopes
+        self.parts = parts
+
+
+def index_state(request):
+    return State([(cache.FEED, None)])
+
+
+def group_state(request, slug):
+    group = cache.get_object_or_404(Group, slug=slug)
+    return State([(cache.GROUP, group.pk)])
+
+
+def profile_state(request, username):
+    author = cache.get_object_or_404(User, username=username)
+    return State([(cache.AUTHOR, author.pk)])
+
+
+def profile_page_state(request, username):
+    """Профиль в HTML: вошедшему он показывает ещё и рекомендации."""
+    state = profile_state(request, username)
+    if request.user.is_authenticated:
+        state.scopes = [*state.scopes, (cache.SUGGESTIONS, None)]
+    return state
+
+
+def post_state(request, post_id):
+    post = cache.get_object_or_404(Post, pk=post_id)
+    return State([(cache.POST, post.pk)])
+
+
+def follow_state(request):
+    return State([(cache.FEED, None), (cache.FOLLOWS, request.user.pk)])
+
+
+def get_last_modified(state):
+    """Unix-время последнего изменения области."""
+    return int(max(cache.get_changed(scope, pk)
+                   for scope, pk in state.scopes))
+
+
+def get_etag(request, state):
+    versions = [cache.get_version(scope, pk) for scope, pk in state.scopes]
+    raw = ':'.join(map(str, [request.get_full_path(), *versions,
+                             *state.parts]))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def conditional(get_state):
+    """Декоратор GET-view: 304 при совпадении ETag или Last-Modified.
+
+    ``get_state(request, *args, **kwargs)`` возвращает ``State`` и
+    вызывается один раз на запрос.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            state = get_state(request, *args, **kwargs)
+            etag = get_etag(request, state)
+            last_modified = get_last_modified(state)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if routers.reading_replica():
+                    # ответ с отстающей реплики не должен получать
+                    # валидаторы свежих поколений
+                    return response
+            if response.status_code in (200, 304):
+                response.setdefault('ETag', etag)
+                response.setdefault('Last-Modified', http_date(last_modified))
+            return response
+        return wrapper
+    return decorator
+
+
+def for_visitor(get_state):
+    """Валидаторы страницы, которая показывает посетителю его подписки."""
+    @wraps(get_state)
+    def wrapper(request, *args, **kwargs):
+        state = get_state(request, *args, **kwargs)
+        user = request.user
+        if user.is_authenticated:
+            state.scopes = [*state.scopes, (cache.FOLLOWS, user.pk)]
+            state.parts = (*state.parts, user.pk)
+        return state
+    return wrapper
+
+
+def page(get_state):
+    """``conditional`` для HTML-страницы с заголовками для прокси.
+
+    Анонимную страницу прокси может отдавать ``PAGE_PROXY_MAX_AGE``
+    секунд, а затем перепроверить по ETag; страницы вошедшего
+    пользователя только для его браузера и всегда перепроверяются.
+    """
+    def decorator(view):
+        view = conditional(for_visitor(get_state))(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = view(request, *args, **kwargs)
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=0,
+                                    s_maxage=settings.PAGE_PROXY_MAX_AGE)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,331 @@
+"""Граф подписок в памяти процесса.
+
+Подписки хранятся двумя таблицами смежности в формате CSR: у каждого
+пользователя отсортированный массив авторов, на которых он подписан, и
+отсортированный массив подписчиков. Строка пользователя ``u`` — срез
+``targets[offsets[u]:offsets[u + 1]]``, номером строки служит id, поэтому
+граф занимает 4 байта на ребро в каждом направлении и 8 байт на
+пользователя, без объекта Python на ребро.
+
+Подписки после загрузки копятся поверх массивов в наборах добавленных и
+удалённых рёбер, а когда их набирается ``FOLLOW_GRAPH_COMPACT_EVERY``,
+сливаются в новые массивы. Другие процессы узнают о подписках из журнала в
+общем кэше: после фиксации транзакции сигналы ``Follow`` дописывают
+изменение под очередным номером, и граф перед чтением применяет записи,
+которых ещё не видел. Если журнал вытеснен или граф отстал больше чем на
+``FOLLOW_GRAPH_LOG_LIMIT`` записей, граф загружается из базы заново.
+Включается настройкой ``FOLLOW_GRAPH_ENABLED``.
+"""
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+_SEQUENCE = 'graph:follows:seq'
+# сколько секунд ждать запись журнала, номер которой уже выдан
+_GAP_TIMEOUT = 5
+
+
+def _zeros(typecode, count):
+    return array(typecode, bytes(array(typecode).itemsize * count))
+
+
+class Adjacency:
+    """Строки CSR и изменения поверх них.
+
+    Наборы изменений не меняются на месте, а заменяются новыми, поэтому
+    читать их можно без блокировки, пока другой поток пишет.
+    """
+
+    def __init__(self, offsets=None, targets=None):
+        self.offsets = offsets if offsets is not None else array('q', [0])
+        self.targets = targets if targets is not None else array('i')
+        self.added = {}
+        self.removed = {}
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Строки из пар (строка, сосед), упорядоченных по обоим полям."""
+        offsets, targets = array('q', [0]), array('i')
+        for node, other in pairs:
+            while len(offsets) <= node:
+                offsets.append(len(targets))
+            targets.append(other)
+        offsets.append(len(targets))
+        return cls(offsets, targets)
+
+    def transposed(self):
+        """Обратные строки: сосед -> узлы, у которых он в строке."""
+        offsets, targets = self.offsets, self.targets
+        size = max(len(offsets) - 1, max(targets, default=-1) + 1)
+        counts = _zeros('q', size + 1)
+        for other in targets:
+            counts[other + 1] += 1
+        for node in range(size):
+            counts[node + 1] += counts[node]
+        positions = array('q', counts)
+        result = _zeros('i', len(targets))
+        for node in range(len(offsets) - 1):
+            for other in targets[offsets[node]:offsets[node + 1]]:
+                result[positions[other]] = node
+                positions[other] += 1
+        return Adjacency(counts, result)
+
+    def _bounds(self, node):
+        if 0 <= node < len(self.offsets) - 1:
+            return self.offsets[node], self.offsets[node + 1]
+        return 0, 0
+
+    def _stored(self, node, other):
+        start, end = self._bounds(node)
+        index = bisect_left(self.targets, other, start, end)
+        return index < end and self.targets[index] == other
+
+    def row(self, node):
+        """Отсортированные соседи узла."""
+        start, end = self._bounds(node)
+        added, removed = self.added.get(node), self.removed.get(node)
+        if not added and not removed:
+            return self.targets[start:end]
+        neighbours = set(self.targets[start:end])
+        neighbours.difference_update(removed or ())
+        neighbours.update(added or ())
+        return array('i', sorted(neighbours))
+
+    def contains(self, node, other):
+        if other in self.added.get(node, ()):
+            return True
+        if other in self.removed.get(node, ()):
+            return False
+        return self._stored(node, other)
+
+    def degree(self, node):
+        start, end = self._bounds(node)
+        return (end - start + len(self.added.get(node, ()))
+                - len(self.removed.get(node, ())))
+
+    @property
+    def pending(self):
+        return (sum(map(len, self.added.values()))
+                + sum(map(len, self.removed.values())))
+
+    def add(self, node, other):
+        removed = self.removed.get(node, frozenset())
+        if other in removed:
+            self._replace(self.removed, node, removed - {other})
+        elif not self._stored(node, other):
+            self.added[node] = self.added.get(node, frozenset()) | {other}
+
+    def remove(self, node, other):
+        added = self.added.get(node, frozenset())
+        if other in added:
+            self._replace(self.added, node, added - {other})
+        elif self._stored(node, other):
+            self.removed[node] = (self.removed.get(node, frozenset())
+                                  | {other})
+
+    @staticmethod
+    def _replace(changes, node, value):
+        if value:
+            changes[node] = value
+        else:
+            changes.pop(node, None)
+
+    def compacted(self):
+        """Новые строки CSR с применёнными изменениями."""
+        size = max(len(self.offsets) - 1, max(self.added, default=-1) + 1)
+        offsets, targets = array('q', [0]), array('i')
+        for node in range(size):
+            if node in self.added or node in self.removed:
+                targets.extend(self.row(node))
+            else:
+                start, end = self._bounds(node)
+                targets.extend(self.targets[start:end])
+            offsets.append(len(targets))
+        return Adjacency(offsets, targets)
+
+    @property
+    def nbytes(self):
+        return (len(self.offsets) * self.offsets.itemsize
+                + len(self.targets) * self.targets.itemsize)
+
+
+def _intersect(first, second):
+    """Пересечение отсортированных массивов, отсортированное."""
+    if len(first) > len(second):
+        first, second = second, first
+    if len(first) * 16 < len(second):
+        # маленький набор проверяется двоичным поиском по большому
+        result = []
+        for value in first:
+            index = bisect_left(second, value)
+            if index < len(second) and second[index] == value:
+                result.append(value)
+        return result
+    return sorted(set(first).intersection(second))
+
+
+class FollowGraph:
+    """Подписки: following — на кого подписан, followers — кто подписан."""
+
+    def __init__(self, following, followers=None):
+        self.following_rows = following
+        self.followers_rows = (followers if followers is not None
+                               else following.transposed())
+        self.applied = None
+        self._gap = None
+
+    @classmethod
+    def from_pairs(cls, pairs):
+        """Граф из пар (user_id, author_id), упорядоченных по обоим."""
+        return cls(Adjacency.from_pairs(pairs))
+
+    @classmethod
+    def load(cls):
+        pairs = (Follow.objects.order_by('user_id', 'author_id')
+                 .values_list('user_id', 'author_id')
+                 .iterator(chunk_size=10000))
+        return cls.from_pairs(pairs)
+
+    def following(self, user_id):
+        return self.following_rows.row(user_id)
+
+    def followers(self, author_id):
+        return self.followers_rows.row(author_id)
+
+    def is_following(self, user_id, author_id):
+        return self.following_rows.contains(user_id, author_id)
+
+    def following_count(self, user_id):
+        return self.following_rows.degree(user_id)
+
+    def follower_count(self, author_id):
+        return self.followers_rows.degree(author_id)
+
+    def mutuals(self, user_id):
+        """Взаимные подписки пользователя."""
+        return _intersect(self.following(user_id), self.followers(user_id))
+
+    def common_following(self, user_id, other_id):
+        return _intersect(self.following(user_id), self.following(other_id))
+
+    def common_followers(self, author_id, other_id):
+        return _intersect(self.followers(author_id),
+                          self.followers(other_id))
+
+    def friends_of_friends(self, user_id, limit=None):
+        """Авторы, на которых подписаны авторы пользователя, по частоте.
+
+        Сам пользователь и авторы, на которых он уже подписан, не
+        попадают в выдачу.
+        """
+        following = self.following(user_id)
+        counts = Counter()
+        for author_id in following:
+            counts.update(self.following(author_id))
+        counts.pop(user_id, None)
+        for author_id in following:
+            counts.pop(author_id, None)
+        return counts.most_common(limit)
+
+    @property
+    def edges(self):
+        return (len(self.following_rows.targets)
+                + sum(map(len, self.following_rows.added.values()))
+                - sum(map(len, self.following_rows.removed.values())))
+
+    @property
+    def nbytes(self):
+        return self.following_rows.nbytes + self.followers_rows.nbytes
+
+    def apply(self, user_id, author_id, followed):
+        if followed:
+            self.following_rows.add(user_id, author_id)
+            self.followers_rows.add(author_id, user_id)
+        else:
+            self.following_rows.remove(user_id, author_id)
+            self.followers_rows.remove(author_id, user_id)
+
+    def compact(self):
+        if (self.following_rows.pending
+                >= settings.FOLLOW_GRAPH_COMPACT_EVERY):
+            self.following_rows = self.following_rows.compacted()
+            self.followers_rows = self.followers_rows.compacted()
+
+    def sync(self):
+        """Применить новые записи журнала; False — граф нужно загрузить."""
+        last = cache.get(_SEQUENCE)
+        if (last is None or last < self.applied
+                or last - self.applied > settings.FOLLOW_GRAPH_LOG_LIMIT):
+            return False
+        numbers = range(self.applied + 1, last + 1)
+        entries = cache.get_many([_entry_key(number) for number in numbers])
+        for number in numbers:
+            entry = entries.get(_entry_key(number))
+            if entry is None:
+                # запись ещё не дописана или уже вытеснена из кэша
+                now = time.monotonic()
+                if self._gap is None or self._gap[0] != number:
+                    self._gap = (number, now)
+                elif now - self._gap[1] > _GAP_TIMEOUT:
+                    return False
+                break
+            self.apply(*entry)
+            self.applied = number
+        self.compact()
+        return True
+
+
+def _entry_key(number):
+    return f'graph:follows:{number}'
+
+
+def _sequence():
+    """Номер последней записи журнала; пустой журнал начинается заново."""
+    last = cache.get(_SEQUENCE)
+    if last is None:
+        # случайное начало: новый журнал не продолжит прежний, и граф,
+        # который читал старый, загрузится заново
+        cache.add(_SEQUENCE, random.getrandbits(62), None)
+        last = cache.get(_SEQUENCE)
+    return last
+
+
+_graph = None
+_lock = threading.Lock()
+
+
+def get_graph():
+    """Граф процесса, догнавший журнал подписок."""
+    global _graph
+    with _lock:
+        if _graph is None or not _graph.sync():
+            applied = _sequence()
+            graph = FollowGraph.load()
+            graph.applied = applied
+            _graph = graph
+        return _graph
+
+
+def reset():
+    global _graph
+    with _lock:
+        _graph = None
+
+
+def record(user_id, author_id, followed):
+    """Дописать подписку или отписку в журнал после фиксации транзакции."""
+    def write():
+        _sequence()
+        number = cache.incr(_SEQUENCE)
+        cache.set(_entry_key(number), (user_id, author_id, followed),
+                  settings.FOLLOW_GRAPH_LOG_TIMEOUT)
+    transaction.on_commit(write)
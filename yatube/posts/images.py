@@ -0,0 +1,67 @@
+"""Адаптивные варианты картинок постов для ``<picture>``/``srcset``.
+
+Картинка кадрируется под пропорции карточки и сохраняется в нескольких
+ширинах и форматах из ``settings.IMAGE_VARIANT_WIDTHS`` и
+``settings.IMAGE_VARIANT_FORMATS``. Форматы, которые установленный Pillow не
+умеет сохранять (например, AVIF без плагина), пропускаются; прогрессивный
+JPEG остаётся запасным вариантом для всех браузеров.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', {'quality': 60}),
+    'webp': ('WEBP', 'image/webp', {'quality': 75, 'method': 6}),
+    'jpeg': ('JPEG', 'image/jpeg',
+             {'quality': 80, 'optimize': True, 'progressive': True}),
+}
+
+
+def supported_formats():
+    """Форматы из настроек, которые Pillow может записать."""
+    Image.init()
+    return [fmt for fmt in settings.IMAGE_VARIANT_FORMATS
+            if FORMATS[fmt][0] in Image.SAVE]
+
+
+def variant_name(name, width, fmt):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return f'posts/variants/{stem}-{width}w.{fmt}'
+
+
+def generate_variants(name):
+    """Создать варианты картинки; вернуть {формат: [[ширина, url], ...]}."""
+    ratio_w, ratio_h = settings.IMAGE_VARIANT_RATIO
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        image.load()
+    image = image.convert('RGB')
+    variants = {}
+    for fmt in supported_formats():
+        pil_format, _, options = FORMATS[fmt]
+        variants[fmt] = []
+        for width in settings.IMAGE_VARIANT_WIDTHS:
+            size = (width, round(width * ratio_h / ratio_w))
+            resized = ImageOps.fit(image, size, Image.LANCZOS)
+            buffer = BytesIO()
+            resized.save(buffer, pil_format, **options)
+            path = variant_name(name, width, fmt)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            path = default_storage.save(path, ContentFile(buffer.getvalue()))
+            variants[fmt].append([width, default_storage.url(path)])
+    return variants
+
+
+def sources(variants):
+    """Источники для ``<picture>``: от современных форматов к запасному."""
+    return [
+        {'type': FORMATS[fmt][1],
+         'srcset': ', '.join(f'{url} {width}w' for width, url in items)}
+        for fmt, items in variants.items()
+    ]
@@ -0,0 +1,151 @@
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (override_settings, setup_test_environment,
+                               teardown_test_environment)
+
+from posts.benchmarks import database, graph, pages, render, suggestions
+from posts.benchmarks.utils import compare
+
+
+class Command(BaseCommand):
+    help = ('Наполняет тестовую базу синтетическими данными и измеряет '
+            'p50/p95/p99, число запросов и размер ответа страниц posts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=100,
+                            help='замеров на сценарий')
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--scenario', action='append',
+                            choices=pages.SCENARIOS,
+                            help='сценарий; по умолчанию все')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='записать отчёт в JSON')
+        parser.add_argument('--baseline',
+                            help='сравнить с базовым JSON-отчётом')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='допустимый рост времени и размера')
+        parser.add_argument('--concurrent', type=int, metavar='THREADS',
+                            help='вместо сценариев нагрузить базу '
+                                 'параллельными чтениями и записями')
+        parser.add_argument('--duration', type=float, default=5.0,
+                            help='длительность параллельной нагрузки, сек.')
+        parser.add_argument('--write-ratio', type=float, default=0.3)
+        parser.add_argument('--compare-pragmas', action='store_true',
+                            help='параллельная нагрузка SQLite с прагмами '
+                                 'по умолчанию и с SQLITE_PRAGMAS')
+        parser.add_argument('--render-cards', action='store_true',
+                            help='вместо сценариев сравнить рендер '
+                                 'карточек постов')
+        parser.add_argument('--follow-graph', type=int, nargs='?',
+                            const=graph.GRAPH_EDGES, metavar='EDGES',
+                            help='вместо сценариев измерить граф подписок '
+                                 'в памяти; по умолчанию 10^7 рёбер')
+        parser.add_argument('--suggestions', type=int, nargs='?',
+                            const=graph.GRAPH_EDGES, metavar='EDGES',
+                            help='вместо сценариев измерить расчёт '
+                                 'рекомендаций; по умолчанию 10^7 рёбер')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='не удалять тестовую базу после прогона')
+
+    def handle(self, *args, **options):
+        if options['follow_graph']:
+            # граф строится из синтетических рёбер, база не нужна
+            report = graph.run_graph(
+                edges=options['follow_graph'], random_seed=options['seed'])
+        elif options['suggestions']:
+            report = suggestions.run_suggestions(
+                edges=options['suggestions'], random_seed=options['seed'])
+        elif options['compare_pragmas']:
+            if connection.vendor != 'sqlite':
+                raise CommandError('Прагмы сравниваются только для SQLite')
+            options['concurrent'] = options['concurrent'] or 8
+            report = {}
+            profiles = (('baseline', settings.SQLITE_BASELINE_PRAGMAS),
+                        ('tuned', settings.SQLITE_PRAGMAS))
+            for label, pragmas in profiles:
+                with override_settings(SQLITE_PRAGMAS=pragmas):
+                    report.update(
+                        (f'{scenario}_{label}', metrics)
+                        for scenario, metrics in self.measure(options).items())
+        else:
+            report = self.measure(options)
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, sort_keys=True)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = compare(
+                    report, json.load(baseline), options['tolerance'])
+            if regressions:
+                raise CommandError(
+                    'Регрессии:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def measure(self, options):
+        """Прогон на свежей тестовой базе."""
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        if options['concurrent'] and connection.vendor == 'sqlite':
+            # Потокам нужна общая база в файле, а не в памяти.
+            connection.settings_dict['TEST']['NAME'] = os.path.join(
+                tempfile.gettempdir(), 'yatube_benchmark.sqlite3')
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            pages.seed(
+                posts=options['posts'],
+                users=options['users'],
+                groups=options['groups'],
+                follows_per_user=options['follows_per_user'],
+                random_seed=options['seed'],
+            )
+            if options['render_cards']:
+                return render.run_render(
+                    counts=[count for count in render.RENDER_COUNTS
+                            if count <= options['posts']] or [1])
+            if options['concurrent']:
+                return database.run_concurrent(
+                    threads=options['concurrent'],
+                    duration=options['duration'],
+                    write_ratio=options['write_ratio'],
+                    random_seed=options['seed'],
+                )
+            return pages.run(
+                scenarios=options['scenario'] or pages.SCENARIOS,
+                requests=options['requests'],
+                warmup=options['warmup'],
+                random_seed=options['seed'],
+            )
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+    def print_report(self, report):
+        columns = [name for name in ('p50', 'p95', 'p99', 'queries',
+                                     'bytes', 'per_second', 'errors',
+                                     'include', 'cards', 'speedup',
+                                     'edges', 'seconds', 'rows',
+                                     'bytes_per_edge',
+                                     'p50_us', 'p99_us')
+                   if any(name in metrics for metrics in report.values())]
+        widths = [max(11, len(name) + 2) for name in columns]
+        self.stdout.write(
+            f'{"сценарий":<26}' + ''.join(
+                f'{name:>{width}}' for name, width in zip(columns, widths)))
+        for scenario, metrics in report.items():
+            self.stdout.write(
+                f'{scenario:<26}'
+                + ''.join(f'{metrics.get(name, "-"):>{width}}'
+                          for name, width in zip(columns, widths)))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «кого почитать» по подпискам '
+            'всех пользователей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int,
+                            help='авторов на пользователя; по умолчанию '
+                                 'SUGGESTIONS_TOP_K')
+        parser.add_argument('--max-followers', type=int,
+                            default=suggestions.MAX_FOLLOWERS,
+                            help='авторы с большим числом подписчиков не '
+                                 'участвуют в совместных подписках')
+        parser.add_argument('--neighbours', type=int,
+                            default=suggestions.NEIGHBOURS,
+                            help='близких авторов на автора')
+        parser.add_argument('--cofollow-weight', type=float,
+                            default=suggestions.COFOLLOW_WEIGHT)
+        parser.add_argument('--block-entries', type=int,
+                            default=suggestions.BLOCK_ENTRIES,
+                            help='ненулевых значений в блоке расчёта')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = suggestions.rebuild(
+            top_k=options['top_k'],
+            batch_size=options['batch_size'],
+            max_followers=options['max_followers'],
+            neighbours=options['neighbours'],
+            cofollow_weight=options['cofollow_weight'],
+            block_entries=options['block_entries'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендации пересчитаны: {count}'))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает группы, посты, комментарии и подписки в '
+            'NDJSON или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=transfer.FORMATS,
+                            default='ndjson')
+        parser.add_argument('--output', default='-',
+                            help='файл NDJSON (- — stdout) или каталог CSV')
+        parser.add_argument('--model', action='append',
+                            choices=list(transfer.MODELS),
+                            help='модель; по умолчанию все')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        output = options['output']
+        stats = transfer.Stats()
+        rows = transfer.export_rows(options['model'],
+                                    chunk_size=options['chunk_size'])
+        if options['format'] == 'csv':
+            if output == '-':
+                raise CommandError('Для CSV нужен каталог в --output')
+            transfer.write_csv(rows, output, stats)
+        elif output == '-':
+            transfer.write_ndjson(rows, self.stdout, stats)
+        else:
+            with open(output, 'w', encoding='utf-8') as stream:
+                transfer.write_ndjson(rows, stream, stats)
+        for name, count in stats.rows.items():
+            self.stderr.write(
+                f'{name}: {count} строк, {stats.rate(name):.0f} строк/с')
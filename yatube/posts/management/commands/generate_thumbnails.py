@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Создаёт миниатюры и адаптивные варианты картинок для постов, '
+            'у которых их ещё нет.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='пересоздать миниатюры всех постов')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('pk', 'image',
+                                                    'thumbnails')
+        done = 0
+        for post in posts.iterator():
+            if (options['all'] or not post.thumbnail_urls
+                    or not post.image_variants):
+                thumbnails.render(post.pk, post.image.name)
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f'Обработано постов: {done}'))
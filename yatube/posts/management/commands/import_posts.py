@@ -0,0 +1,39 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает выгрузку export_posts пачками через bulk_create, '
+            'сохраняя ключи и даты, и пересчитывает ленты и счётчики.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('source',
+                            help='файл NDJSON (- — stdin) или каталог CSV')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='пропускать строки, которые уже есть')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        if os.path.isdir(source):
+            stats = self.load(transfer.read_csv(source), options)
+        elif source == '-':
+            stats = self.load(transfer.read_ndjson(sys.stdin), options)
+        else:
+            with open(source, encoding='utf-8') as stream:
+                stats = self.load(transfer.read_ndjson(stream), options)
+        for name, count in stats.rows.items():
+            self.stdout.write(
+                f'{name}: {count} строк, {stats.rate(name):.0f} строк/с')
+        self.stdout.write(self.style.SUCCESS(
+            f'Производные данные пересчитаны за '
+            f'{stats.seconds["rebuild"]:.1f} с'))
+
+    def load(self, rows, options):
+        return transfer.import_rows(
+            rows, batch_size=options['batch_size'],
+            ignore_conflicts=options['ignore_conflicts'])
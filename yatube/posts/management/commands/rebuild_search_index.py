@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов, комментариев и групп.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        search.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен'))
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:38
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(model, field):
+    """Подзапрос с количеством строк model на каждое значение field."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(n=Count('pk')).values('n')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    # по запросу на таблицу, а не COUNT на каждую строку
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    Post.objects.update(comment_count=_count(Comment, 'post'))
+    users = User.objects.annotate(
+        post_n=_count(Post, 'author'),
+        follower_n=_count(Follow, 'author'),
+        following_n=_count(Follow, 'user'),
+    ).values_list('pk', 'post_n', 'follower_n', 'following_n')
+    AuthorStats.objects.bulk_create(
+        (AuthorStats(user_id=pk, post_count=posts, follower_count=followers,
+                     following_count=following)
+         for pk, posts, followers, following in users.iterator()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0011_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+from posts import stemmer
+
+KINDS = ('post', 'comment', 'group')
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    sources = (
+        ('post', apps.get_model('posts', 'Post'), 'text'),
+        ('comment', apps.get_model('posts', 'Comment'), 'text'),
+        ('group', apps.get_model('posts', 'Group'), 'title'),
+    )
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS posts_search USING fts5('
+            "body, stems, tokenize='unicode61 remove_diacritics 2')"
+        )
+        for kind, model, field in sources:
+            cursor.executemany(
+                'INSERT INTO posts_search (rowid, body, stems) '
+                'VALUES (%s, %s, %s)',
+                [(pk * len(KINDS) + KINDS.index(kind), text,
+                  stemmer.stems(text))
+                 for pk, text in model.objects.values_list('pk', field)],
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.db import models
 
@@ -7,6 +9,7 @@ User = get_user_model()
 class Post(models.Model):
     text = models.TextField('Текст поста')
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
                                related_name='posts'
@@ -22,15 +25,85 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    thumbnails = models.TextField(
+        'Миниатюры',
+        blank=True,
+        default='',
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        # Индексы по возрастанию: обратный обход даёт порядок
+        # (pub_date DESC, id DESC) без временной сортировки.
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.text
 
+    def _thumbnail_data(self):
+        data = json.loads(self.thumbnails or '{}')
+        if not self.image or data.get('image') != self.image.name:
+            return {}
+        return data
+
+    @property
+    def thumbnail_urls(self):
+        """Готовые миниатюры текущей картинки: {размер: url}."""
+        return self._thumbnail_data().get('sizes', {})
+
+    @property
+    def image_variants(self):
+        """Адаптивные варианты картинки: {формат: [[ширина, url], ...]}."""
+        return self._thumbnail_data().get('variants', {})
+
+    @property
+    def thumbnail_url(self):
+        """Миниатюра для карточки или None, пока она не создана."""
+        return self.thumbnail_urls.get('card')
+
+
+class PostRevision(models.Model):
+    """Прежняя версия текста поста, только добавляется.
+
+    ``delta`` восстанавливает текст этой версии из следующей (обратная
+    дельта, см. ``posts.revisions``); снимок хранит текст целиком.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='revisions')
+    number = models.PositiveIntegerField('Номер версии')
+    editor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
+                               related_name='+')
+    created = models.DateTimeField('Дата правки', auto_now_add=True)
+    snapshot = models.BooleanField('Полный текст', default=False)
+    delta = models.TextField('Дельта')
+
+    class Meta:
+        ordering = ('post', 'number')
+        verbose_name = 'Версия поста'
+        verbose_name_plural = 'Версии постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'number'],
+                name='unique_post_revision')
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}: {self.number}'
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
@@ -67,6 +140,10 @@ class Comment(models.Model):
         ordering = ['-created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -85,6 +162,90 @@ class Follow(models.Model):
                 fields=['author', 'user'],
                 name='unique_follower')
         ]
+        indexes = [
+            models.Index(fields=['user', 'author'],
+                         name='follow_user_author_idx'),
+        ]
 
     def str(self):
         return f"{self.author}, follower:{self.user}"
+
+
+class AuthorStats(models.Model):
+    """Счётчики автора, которые обновляются при записи, а не при чтении."""
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='stats')
+    post_count = models.PositiveIntegerField('Постов', default=0)
+    follower_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.user}: {self.post_count}'
+
+
+class FeedEntry(models.Model):
+    """Строка материализованной ленты подписок пользователя.
+
+    Заполняется при публикации поста (fan-out on write) и при подписке,
+    чтобы страница подписок читала готовые строки по индексу.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE,
+                             related_name='feed_entries')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.post_id}'
+
+
+class Suggestion(models.Model):
+    """Автор, которого стоит предложить пользователю.
+
+    Строки пересчитываются пакетно командой ``build_suggestions``: у
+    каждого пользователя хранятся лучшие ``SUGGESTIONS_TOP_K`` авторов.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='suggestions')
+    author = models.ForeignKey(User, on_delete=models.CASCADE,
+                               related_name='+')
+    score = models.FloatField('Оценка')
+
+    class Meta:
+        ordering = ('user', '-score')
+        verbose_name = 'Рекомендация'
+        verbose_name_plural = 'Рекомендации'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_suggestion')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-score'],
+                         name='suggestion_user_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user}: {self.author_id}'
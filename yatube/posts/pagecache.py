@@ -0,0 +1,140 @@
+"""Кэш целых страниц с «дырками» под данные посетителя.
+
+Анониму страница отдаётся из кэша целиком, без view и шаблона. Вошедшему
+пользователю отдаётся общий для всех HTML, в котором шапка, переключатель
+лент, кнопка подписки, рекомендации авторов и форма комментария при
+рендере заменены метками ``{% hole %}``; на каждом запросе метки
+заполняются маленькими шаблонами из ``HOLES``.
+
+Ключ строится как ETag из ``posts.freshness``: адрес с параметрами и
+поколения областей кэша, поэтому записи постов, комментариев и групп
+сами выводят старые страницы из употребления. Кэш включается настройкой
+``PAGE_CACHE_ENABLED``.
+"""
+import base64
+import json
+import re
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from core import routers
+
+from . import cache, freshness
+from .forms import CommentForm
+from .models import Post, User
+
+_state = threading.local()
+
+_MARKER = re.compile(r'<!--hole:([\w=-]+)-->')
+
+HOLES = {}
+
+
+def hole(template_name):
+    """Зарегистрировать шаблон дырки и функцию его контекста.
+
+    Функция получает запрос и аргументы тега ``{% hole %}`` и возвращает
+    контекст шаблона.
+    """
+    def register(get_context):
+        HOLES[template_name] = get_context
+        return get_context
+    return register
+
+
+@hole('includes/header.html')
+@hole('includes/suggestions.html')
+@hole('includes/switcher.html')
+def _request_only(request):
+    return {}
+
+
+@hole('includes/follow_button.html')
+def _follow_button(request, username):
+    return {'author': cache.get_object_or_404(User, username=username)}
+
+
+def _get_post(post_id):
+    # тот же запрос, что в post_detail: объект в кэше у них общий
+    return cache.get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+
+
+@hole('includes/post_actions.html')
+def _post_actions(request, post_id):
+    return {'post': _get_post(post_id), 'form': CommentForm()}
+
+
+def punching():
+    """Рендерится ли сейчас общая для пользователей страница."""
+    return getattr(_state, 'punching', False)
+
+
+def marker(template_name, args):
+    payload = json.dumps([template_name, args], sort_keys=True)
+    return '<!--hole:{}-->'.format(
+        base64.urlsafe_b64encode(payload.encode()).decode())
+
+
+def fill(request, content):
+    """Заменить метки дырок на их HTML для этого запроса."""
+    def render(match):
+        template_name, args = json.loads(
+            base64.urlsafe_b64decode(match.group(1)))
+        if template_name not in HOLES:
+            return ''
+        context = HOLES[template_name](request, **args)
+        return render_to_string(template_name, context, request)
+    return _MARKER.sub(render, content)
+
+
+def page_state(request, post_id):
+    """Области страницы поста: сам пост и счётчик постов автора."""
+    post = _get_post(post_id)
+    return freshness.State(
+        [(cache.POST, post.pk), (cache.AUTHOR, post.author_id)])
+
+
+def cached(get_state):
+    """Декоратор GET-view страницы, одинаковой для всех посетителей.
+
+    ``get_state`` — функция областей из ``posts.freshness``.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (not settings.PAGE_CACHE_ENABLED
+                    or request.method not in ('GET', 'HEAD')):
+                return view(request, *args, **kwargs)
+            store = caches[settings.PAGE_CACHE_ALIAS]
+            personal = request.user.is_authenticated
+            state = get_state(request, *args, **kwargs)
+            key = 'page:{}:{}'.format(
+                'holes' if personal else 'full',
+                freshness.get_etag(request, state).strip('"'))
+            page = store.get(key)
+            if page is None:
+                _state.punching = personal
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    _state.punching = False
+                if response.status_code != 200 or response.streaming:
+                    return response
+                content = response.content.decode(response.charset)
+                if not routers.reading_replica():
+                    store.set(key, (content, response['Content-Type']),
+                              settings.PAGE_CACHE_TIMEOUT)
+            else:
+                content, content_type = page
+                response = HttpResponse(content, content_type=content_type)
+            if personal:
+                response.content = fill(request, content)
+            return response
+        return wrapper
+    return decorator
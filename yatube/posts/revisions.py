@@ -0,0 +1,111 @@
+"""История правок текста поста на обратных дельтах.
+
+Текущий текст лежит в ``Post.text``, а каждая правка добавляет
+``PostRevision`` с версией текста до неё. ``delta`` получает эту версию из
+следующей: JSON-список, где положительное число копирует столько токенов
+следующей версии, отрицательное столько же пропускает, а строка
+вставляется как есть. Токены — слова и промежутки между ними, поэтому
+мелкая правка длинного поста занимает десяток байт.
+
+Каждая ``REVISION_SNAPSHOT_EVERY``-я версия и любая, чья дельта не короче
+самого текста, хранится целиком: чтобы восстановить версию, достаточно
+применить не больше ``REVISION_SNAPSHOT_EVERY`` дельт.
+"""
+import difflib
+import json
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .models import Post, PostRevision
+
+_TOKENS = re.compile(r'\s+|\S+')
+
+
+def tokens(text):
+    return _TOKENS.findall(text)
+
+
+def _opcodes(older, newer):
+    return difflib.SequenceMatcher(
+        None, older, newer, autojunk=False).get_opcodes()
+
+
+def make_delta(newer, older):
+    """Операции, которые строят токены ``older`` из токенов ``newer``."""
+    delta = []
+    for tag, i1, i2, j1, j2 in _opcodes(newer, older):
+        if tag == 'equal':
+            delta.append(i2 - i1)
+            continue
+        if i2 > i1:
+            delta.append(i1 - i2)
+        if j2 > j1:
+            delta.append(''.join(older[j1:j2]))
+    return delta
+
+
+def apply_delta(newer_text, delta):
+    newer = tokens(newer_text)
+    position, parts = 0, []
+    for operation in delta:
+        if isinstance(operation, str):
+            parts.append(operation)
+        elif operation > 0:
+            parts.extend(newer[position:position + operation])
+            position += operation
+        else:
+            position -= operation
+    return ''.join(parts)
+
+
+@transaction.atomic
+def record(post, previous_text, editor):
+    """Сохранить версию ``previous_text``, если правка изменила текст.
+
+    Строка поста блокируется до конца транзакции, чтобы две одновременные
+    правки не взяли один и тот же номер версии.
+    """
+    if previous_text == post.text:
+        return None
+    Post.objects.select_for_update().filter(pk=post.pk).exists()
+    last = post.revisions.aggregate(last=Max('number'))['last'] or 0
+    number = last + 1
+    delta = json.dumps(make_delta(tokens(post.text), tokens(previous_text)),
+                       ensure_ascii=False, separators=(',', ':'))
+    snapshot = (number % settings.REVISION_SNAPSHOT_EVERY == 0
+                or len(delta) >= len(previous_text))
+    return PostRevision.objects.create(
+        post=post, number=number, editor=editor, snapshot=snapshot,
+        delta=previous_text if snapshot else delta)
+
+
+def get_text(post, number):
+    """Текст версии ``number``; версия после последней правки — текущая."""
+    snapshot = (post.revisions.filter(number__gte=number, snapshot=True)
+                .order_by('number').values_list('number', flat=True).first())
+    chain = post.revisions.filter(number__gte=number).order_by('-number')
+    text = post.text
+    if snapshot is not None:
+        chain = chain.filter(number__lte=snapshot)
+    for revision in chain.only('snapshot', 'delta'):
+        text = (revision.delta if revision.snapshot
+                else apply_delta(text, json.loads(revision.delta)))
+    return text
+
+
+def diff(older, newer):
+    """Пословная разница: список пар (equal|delete|insert, текст)."""
+    older, newer = tokens(older), tokens(newer)
+    chunks = []
+    for tag, i1, i2, j1, j2 in _opcodes(older, newer):
+        if tag == 'equal':
+            chunks.append(('equal', ''.join(older[i1:i2])))
+            continue
+        if i2 > i1:
+            chunks.append(('delete', ''.join(older[i1:i2])))
+        if j2 > j1:
+            chunks.append(('insert', ''.join(newer[j1:j2])))
+    return chunks
@@ -0,0 +1,185 @@
+"""Полнотекстовый поиск по постам, комментариям и группам.
+
+Индекс — виртуальная таблица SQLite FTS5 ``posts_search`` с двумя
+колонками: исходным текстом и основами слов из ``posts.stemmer``. Сигналы
+обновляют строку индекса при каждой записи. Результаты ранжируются по bm25
+и листаются курсором по ``(rank, rowid)``, поэтому время ответа не зависит
+от размера таблицы постов и номера страницы.
+"""
+import base64
+import json
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.urls import reverse
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import stemmer
+from .models import Comment, Group, Post
+from .utils import CursorPage, get_cursor_page
+
+TABLE = 'posts_search'
+# rowid строки индекса = pk * len(KINDS) + номер вида объекта
+KINDS = ('post', 'comment', 'group')
+MARK_START, MARK_END = '\x02', '\x03'
+
+SearchResult = namedtuple('SearchResult', 'kind object url snippet')
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, pk):
+    return pk * len(KINDS) + KINDS.index(kind)
+
+
+def index(kind, pk, text):
+    """Добавить или обновить объект в индексе."""
+    if not is_available():
+        return
+    rowid = _rowid(kind, pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, body, stems) VALUES (%s, %s, %s)',
+            [rowid, text, stemmer.stems(text)],
+        )
+
+
+def remove(kind, pk):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                       [_rowid(kind, pk)])
+
+
+def rebuild(batch_size=1000):
+    """Переиндексировать все посты, комментарии и группы."""
+    sources = (
+        ('post', Post.objects.values_list('pk', 'text')),
+        ('comment', Comment.objects.values_list('pk', 'text')),
+        ('group', Group.objects.values_list('pk', 'title')),
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        for kind, rows in sources:
+            cursor.executemany(
+                f'INSERT INTO {TABLE} (rowid, body, stems) '
+                'VALUES (%s, %s, %s)',
+                [(_rowid(kind, pk), text, stemmer.stems(text))
+                 for pk, text in rows.iterator(chunk_size=batch_size)],
+            )
+
+
+def build_query(query):
+    """Запрос FTS5: каждое слово ищется по префиксу слова или основы."""
+    terms = stemmer.words(query)[:settings.SEARCH_MAX_TERMS]
+    return ' AND '.join(
+        f'(body:"{word}"* OR stems:"{stemmer.stem(word) or word}"*)'
+        for word in terms)
+
+
+def matching_ids(kind, query):
+    """Подзапрос с pk объектов вида ``kind``, подходящих под запрос."""
+    return RawSQL(
+        f'SELECT rowid / {len(KINDS)} FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s AND rowid %% {len(KINDS)} = %s',
+        [build_query(query), KINDS.index(kind)],
+    )
+
+
+def _encode(rank, rowid):
+    raw = json.dumps([rank, rowid]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, rowid = json.loads(raw)
+        return float(rank), int(rowid)
+    except (TypeError, ValueError):
+        return None
+
+
+def _snippet(text):
+    return mark_safe(
+        escape(text).replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>'))
+
+
+def _results(rows):
+    """Превратить строки индекса в объекты, выбранные пачками."""
+    wanted = {kind: [] for kind in KINDS}
+    for rowid, _, _ in rows:
+        wanted[KINDS[rowid % len(KINDS)]].append(rowid // len(KINDS))
+    objects = {
+        'post': Post.objects.select_related('author', 'group')
+        .in_bulk(wanted['post']),
+        'comment': Comment.objects.select_related('author', 'post')
+        .in_bulk(wanted['comment']),
+        'group': Group.objects.in_bulk(wanted['group']),
+    }
+    results = []
+    for rowid, _, snippet in rows:
+        kind, pk = KINDS[rowid % len(KINDS)], rowid // len(KINDS)
+        obj = objects[kind].get(pk)
+        if obj is None:
+            continue
+        if kind == 'group':
+            url = reverse('posts:group_list', args=[obj.slug])
+        else:
+            url = reverse('posts:post_detail',
+                          args=[obj.post_id if kind == 'comment' else pk])
+        results.append(SearchResult(kind, obj, url, _snippet(snippet)))
+    return results
+
+
+def _search_without_index(query, cursor, per_page):
+    """Запасной поиск по постам для баз без FTS5: новые первыми."""
+    page = get_cursor_page(
+        Post.objects.select_related('author', 'group')
+        .filter(text__icontains=query), cursor, per_page)
+    page.object_list = [
+        SearchResult('post', post,
+                     reverse('posts:post_detail', args=[post.pk]),
+                     escape(post.text))
+        for post in page.object_list
+    ]
+    return page
+
+
+def search(query, cursor=None, per_page=None):
+    """Страница результатов по убыванию релевантности."""
+    per_page = per_page or settings.SAMPLING
+    match = build_query(query)
+    if not match:
+        return CursorPage([])
+    if not is_available():
+        return _search_without_index(query, cursor, per_page)
+    position = _decode(cursor) if cursor else None
+    rank = f'bm25({TABLE}, 1.0, 0.5)'
+    sql = (
+        f'SELECT rowid, {rank}, '
+        f"snippet({TABLE}, 0, '{MARK_START}', '{MARK_END}', '…', 24) "
+        f'FROM {TABLE} WHERE {TABLE} MATCH %s'
+    )
+    params = [match]
+    if position is not None:
+        sql += f' AND ({rank} > %s OR ({rank} = %s AND rowid > %s))'
+        params += [position[0], position[0], position[1]]
+    sql += f' ORDER BY {rank}, rowid LIMIT %s'
+    params.append(per_page + 1)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows = db_cursor.fetchall()
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = _encode(rows[-1][1], rows[-1][0])
+    return CursorPage(_results(rows), next_cursor=next_cursor)
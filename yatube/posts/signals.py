@@ -0,0 +1,172 @@
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, feed, graph, search, thumbnails
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+# поля, которые показываются на чужих страницах: в карточках постов,
+# комментариях и JSON API
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_DISPLAY_FIELDS = ('slug', 'title')
+
+
+def _previous_values(instance, fields, update_fields):
+    """Значения fields в базе до сохранения; None для новой строки."""
+    if update_fields:
+        fields = [field for field in fields if field in update_fields]
+    if instance.pk is None or not fields:
+        return None
+    return (type(instance).objects.filter(pk=instance.pk)
+            .values(*fields).first())
+
+
+def _changed(instance, previous):
+    return previous is not None and any(
+        getattr(instance, field) != value
+        for field, value in previous.items())
+
+
+def _posts_scopes(posts):
+    """Области страниц с карточками posts и закэшированные посты."""
+    scopes = [(cache.FEED, None)]
+    post_ids = []
+    for pk, author_id, group_id in posts.values_list(
+            'pk', 'author_id', 'group_id').iterator():
+        post_ids.append(pk)
+        scopes += [(cache.POST, pk), (cache.AUTHOR, author_id)]
+        if group_id is not None:
+            scopes.append((cache.GROUP, group_id))
+    cache.forget_object(Post, 'pk', *post_ids)
+    return set(scopes)
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, update_fields=None, **kwargs):
+    instance._previous = _previous_values(
+        instance, GROUP_DISPLAY_FIELDS, update_fields)
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    instance._previous = _previous_values(
+        instance, USER_DISPLAY_FIELDS, update_fields)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # Запоминаем прежнюю группу, чтобы сбросить кэш и её страницы.
+    instance._previous_group_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_stats(instance.author_id, created, post_count=1)
+        feed.fan_out_post(instance)
+    if instance.image and not instance.thumbnail_urls:
+        thumbnails.schedule(instance)
+    search.index('post', instance.pk, instance.text)
+    cache.bump(*cache.post_scopes(
+        instance, getattr(instance, '_previous_group_id', None)))
+    cache.forget_object(Post, 'pk', instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_stats(instance.author_id, False, post_count=-1)
+    search.remove('post', instance.pk)
+    cache.bump(*cache.post_scopes(instance))
+    cache.forget_object(Post, 'pk', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+    search.index('comment', instance.pk, instance.text)
+    cache.bump((cache.POST, instance.post_id))
+    cache.forget_object(Post, 'pk', instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    search.remove('comment', instance.pk)
+    cache.bump((cache.POST, instance.post_id))
+    cache.forget_object(Post, 'pk', instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, signal, **kwargs):
+    if signal is post_save:
+        search.index('group', instance.pk, instance.title)
+    else:
+        search.remove('group', instance.pk)
+    previous = getattr(instance, '_previous', None)
+    scopes = {(cache.FEED, None), (cache.GROUP, instance.pk)}
+    if _changed(instance, previous):
+        # название и slug группы видны в карточках её постов повсюду
+        scopes |= _posts_scopes(Post.objects.filter(group=instance))
+    # При удалении группы посты отвязываются через UPDATE без сигналов.
+    cache.bump(*scopes)
+    cache.forget_object(Group, 'slug', instance.slug,
+                        (previous or {}).get('slug'))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        # строка счётчиков заводится сразу, чтобы профиль её только читал
+        AuthorStats.objects.create(user=instance)
+    previous = getattr(instance, '_previous', None)
+    scopes = {(cache.AUTHOR, instance.pk)}
+    if _changed(instance, previous):
+        # имя автора видно в карточках его постов и под его комментариями
+        commented = Comment.objects.filter(
+            author=instance).values('post_id')
+        scopes |= _posts_scopes(Post.objects.filter(
+            Q(author=instance) | Q(pk__in=commented)))
+    cache.bump(*scopes)
+    cache.forget_object(User, 'username', instance.username,
+                        (previous or {}).get('username'))
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    cache.forget_object(User, 'username', instance.username)
+
+
+def _follow_scopes(follow):
+    # счётчики подписчиков и подписок видны в профилях обоих
+    return [(cache.FOLLOWS, follow.user_id),
+            (cache.AUTHOR, follow.user_id),
+            (cache.AUTHOR, follow.author_id)]
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_stats(instance.author_id, created, follower_count=1)
+        counters.bump_stats(instance.user_id, created, following_count=1)
+        feed.add_author(instance.user_id, instance.author_id)
+        cache.bump(*_follow_scopes(instance))
+        if settings.FOLLOW_GRAPH_ENABLED:
+            graph.record(instance.user_id, instance.author_id, True)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.remove_follower(instance.author_id)
+    counters.bump_stats(instance.user_id, False, following_count=-1)
+    feed.remove_author(instance.user_id, instance.author_id)
+    cache.bump(*_follow_scopes(instance))
+    if settings.FOLLOW_GRAPH_ENABLED:
+        graph.record(instance.user_id, instance.author_id, False)
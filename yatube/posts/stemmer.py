@@ -0,0 +1,130 @@
+"""Стеммер русского языка по алгоритму Snowball (Porter).
+
+Токенайзеры FTS5 не умеют выделять основы русских слов, поэтому основы
+считаются здесь и хранятся в поисковом индексе рядом с исходным текстом.
+"""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+REFLEXIVE = ('ся', 'сь')
+ADJECTIVE = (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем', 'им',
+    'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю', 'ая',
+    'яя', 'ою', 'ею',
+)
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+)
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+WORD = re.compile(r'\w+')
+
+
+def _regions(word):
+    """Начала областей RV и R2."""
+    rv = r1 = r2 = len(word)
+    for i, char in enumerate(word):
+        if char in VOWELS:
+            rv = i + 1
+            break
+    for i in range(1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r1 = i + 1
+            break
+    for i in range(r1 + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            r2 = i + 1
+            break
+    return rv, r2
+
+
+def _strip(rv, endings):
+    """Отрезать самое длинное окончание из списка; None, если нет."""
+    for ending in sorted(endings, key=len, reverse=True):
+        if rv.endswith(ending):
+            return rv[:-len(ending)]
+    return None
+
+
+def _strip_grouped(rv, groups):
+    """Окончания первой группы отрезаются только после «а» или «я»."""
+    first, second = groups
+    for ending in sorted(first + second, key=len, reverse=True):
+        if not rv.endswith(ending):
+            continue
+        stem = rv[:-len(ending)]
+        if ending in second or stem[-1:] in ('а', 'я'):
+            return stem
+    return None
+
+
+def _strip_adjectival(rv):
+    stem = _strip(rv, ADJECTIVE)
+    if stem is None:
+        return None
+    participle = _strip_grouped(stem, PARTICIPLE)
+    return stem if participle is None else participle
+
+
+def stem(word):
+    """Основа одного слова."""
+    word = word.lower().replace('ё', 'е')
+    rv_start, r2_start = _regions(word)
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    result = _strip_grouped(rv, PERFECTIVE_GERUND)
+    if result is None:
+        reflexive = _strip(rv, REFLEXIVE)
+        if reflexive is not None:
+            rv = reflexive
+        for step in (_strip_adjectival,
+                     lambda part: _strip_grouped(part, VERB),
+                     lambda part: _strip(part, NOUN)):
+            result = step(rv)
+            if result is not None:
+                break
+        else:
+            result = rv
+    rv = result
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    r2 = rv[max(r2_start - rv_start, 0):]
+    if r2.endswith(DERIVATIONAL):
+        rv = _strip(rv, DERIVATIONAL)
+    superlative = _strip(rv, SUPERLATIVE)
+    if superlative is not None:
+        rv = superlative
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif superlative is None and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def words(text):
+    return WORD.findall(text.lower())
+
+
+def stems(text):
+    """Основы всех слов текста через пробел."""
+    return ' '.join(stem(word) for word in words(text))
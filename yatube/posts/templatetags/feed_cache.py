@@ -0,0 +1,25 @@
+from django import template
+from django.conf import settings
+
+from core import routers
+from posts import cache
+
+register = template.Library()
+
+
+@register.simple_tag
+def cache_version(scope, pk=None):
+    """Поколение области кэша для ключа ``{% cache %}``."""
+    return cache.get_version(scope, pk)
+
+
+@register.simple_tag
+def fragment_timeout():
+    """Срок жизни фрагментов лент, см. ``CACHE_FRAGMENT_TIMEOUT``.
+
+    Фрагмент, прочитанный с реплики, сразу устаревает: 0 в ``{% cache %}``
+    значит «не хранить».
+    """
+    if routers.reading_replica():
+        return 0
+    return settings.CACHE_FRAGMENT_TIMEOUT
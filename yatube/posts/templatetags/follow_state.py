@@ -0,0 +1,23 @@
+from django import template
+
+from posts import follows
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_id):
+    """Подписан ли посетитель на автора, см. ``posts.follows``.
+
+    ``{% is_following post.author_id as following %}``
+    """
+    return follows.for_request(context['request']).is_following(author_id)
+
+
+@register.simple_tag(takes_context=True)
+def suggested_authors(context):
+    """Кого посетителю стоит почитать, см. ``posts.suggestions``.
+
+    ``{% suggested_authors as authors %}``
+    """
+    return follows.for_request(context['request']).suggested()
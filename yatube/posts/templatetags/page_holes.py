@@ -0,0 +1,21 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import pagecache
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **args):
+    """Подключить шаблон с данными посетителя, как ``{% include %}``.
+
+    При рендере общей страницы для ``posts.pagecache`` вместо шаблона
+    выводится метка, которую заполняют на каждом запросе; аргументы тега
+    попадают в метку и должны сериализоваться в JSON.
+    """
+    if pagecache.punching():
+        return mark_safe(pagecache.marker(template_name, args))
+    included = context.template.engine.get_template(template_name)
+    with context.push(**args):
+        return included.render(context)
@@ -0,0 +1,11 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.filter
+def post_cards(posts, show_comments=False):
+    """Карточки постов страницы, см. ``posts.cards``."""
+    return cards.prepare(posts, show_comments)
@@ -0,0 +1,22 @@
+from django import template
+from django.conf import settings
+
+from posts import images
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_picture.html')
+def post_picture(post):
+    """Разметка ``<picture>`` с вариантами картинки поста."""
+    variants = post.image_variants
+    fallback = 'jpeg' if 'jpeg' in variants else list(variants)[-1]
+    modern = {fmt: items for fmt, items in variants.items()
+              if fmt != fallback}
+    fallback_items = variants[fallback]
+    return {
+        'sources': images.sources(modern),
+        'fallback': images.sources({fallback: fallback_items})[0],
+        'src': post.thumbnail_url or fallback_items[-1][1],
+        'sizes': settings.IMAGE_VARIANT_SIZES,
+    }
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.posts = [
+            Post.objects.create(text=f'Пост {number}', author=cls.author,
+                                group=cls.group)
+            for number in range(12)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_cursor_pages_cover_feed(self):
+        url = reverse('api:post_list')
+        first = self.client.get(url).json()
+        self.assertEqual(len(first['results']), 10)
+        second = self.client.get(url, {'cursor': first['next']}).json()
+        self.assertIsNone(second['next'])
+        ids = [item['id'] for item in first['results'] + second['results']]
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_fields_selection(self):
+        response = self.client.get(
+            reverse('api:group_posts', args=['group']), {'fields': 'id,text'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'text'})
+        response = self.client.get(reverse('api:post_list'),
+                                   {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_not_modified_skips_view(self):
+        """Совпавший ETag даёт 304 без выборки страницы."""
+        url = reverse('api:profile_posts', args=['writer'])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.posts[0].text = 'Правка'
+        self.posts[0].save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_post_etag(self):
+        post = self.posts[0]
+        url = reverse('api:post_detail', args=[post.pk])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=post, author=self.reader, text='Ок')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['comment_count'], 1)
+        comments = self.client.get(
+            reverse('api:post_comments', args=[post.pk])).json()
+        self.assertEqual(comments['results'][0]['text'], 'Ок')
+
+    def test_follow_feed(self):
+        url = reverse('api:follow_feed')
+        self.assertEqual(Client().get(url).status_code, 401)
+        response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 10)
+        etag = response['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_follow_changes_profile_etags(self):
+        """Подписка меняет счётчики в профилях автора и подписчика."""
+        urls = [reverse('api:profile', args=[name])
+                for name in ('writer', 'reader')]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        Follow.objects.filter(user=self.reader).delete()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(urls[0]).json()['follower_count'],
+                         0)
+        self.assertEqual(self.client.get(urls[1]).json()['following_count'],
+                         0)
+
+    def test_profile_and_errors(self):
+        data = self.client.get(reverse('api:profile', args=['writer'])).json()
+        self.assertEqual(data['post_count'], 12)
+        self.assertEqual(data['follower_count'], 1)
+        response = self.client.get(reverse('api:profile', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,75 @@
+from django.test import SimpleTestCase, TestCase
+
+from posts import feed
+from posts.benchmarks import graph, pages, render, suggestions, utils
+from posts.models import AuthorStats, FeedEntry, Post
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        pages.seed(posts=40, users=12, groups=3, follows_per_user=4)
+
+    def test_seed_builds_derived_tables(self):
+        """После сидирования ленты и счётчики совпадают с данными."""
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(
+            sum(AuthorStats.objects.values_list('post_count', flat=True)), 40)
+        entries = set(FeedEntry.objects.values_list('user_id', 'post_id'))
+        self.assertTrue(entries)
+        feed.rebuild()
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('user_id', 'post_id')),
+            entries)
+
+    def test_run_reports_every_scenario(self):
+        report = pages.run(requests=3, warmup=1)
+        self.assertEqual(list(report), list(pages.SCENARIOS))
+        for scenario, metrics in report.items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(metrics['requests'], 3)
+                self.assertLessEqual(metrics['p50'], metrics['p99'])
+                self.assertGreater(metrics['queries'], 0)
+
+    def test_run_render_compares_card_renderers(self):
+        report = render.run_render(counts=(10, 40), repeat=2)
+        self.assertEqual(list(report), ['cards_10', 'cards_40'])
+        for metrics in report.values():
+            self.assertGreater(metrics['include'], 0)
+            self.assertGreater(metrics['cards'], 0)
+
+
+class GraphBenchmarkTests(SimpleTestCase):
+    def test_run_graph_measures_memory_per_edge(self):
+        report = graph.run_graph(edges=5000, users=100, samples=20)
+        build = report['graph_build']
+        self.assertEqual(build['edges'], 5000)
+        self.assertLess(build['bytes_per_edge'], 10)
+        self.assertGreater(report['graph_is_following']['p50_us'], 0)
+
+    def test_run_suggestions_counts_rows(self):
+        build = suggestions.run_suggestions(
+            edges=5000, users=100, top_k=5)['suggestions_build']
+        self.assertEqual(build['edges'], 5000)
+        self.assertEqual(build['rows'], 500)
+
+
+class CompareTests(SimpleTestCase):
+    def test_compare_flags_regressions(self):
+        baseline = {'index': {'p50': 10, 'p95': 20, 'p99': 30,
+                              'queries': 3, 'bytes': 1000}}
+        report = {'index': {'p50': 11, 'p95': 30, 'p99': 30,
+                            'queries': 4, 'bytes': 1000}}
+        self.assertEqual(utils.compare(report, baseline, 0.2),
+                         ['index.p95: 30 > 20', 'index.queries: 4 > 3'])
+
+    def test_compare_flags_missing_metrics(self):
+        baseline = {'concurrent_write': {'p50': 10, 'errors': 0}}
+        report = {'concurrent_write': {'p50': 10}}
+        self.assertEqual(utils.compare(report, baseline),
+                         ['concurrent_write.errors: нет в отчёте'])
+
+    def test_compare_flags_missing_scenarios(self):
+        baseline = {'index': {'p50': 10}, 'search': {'p50': 10}}
+        report = {'index': {'p50': 10}, 'profile': {'p50': 99}}
+        self.assertEqual(utils.compare(report, baseline),
+                         ['search: нет в отчёте'])
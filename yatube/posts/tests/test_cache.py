@@ -0,0 +1,183 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import Http404
+from django.db import connection, transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import cache as posts_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FragmentCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Первый текст', author=self.user, group=self.group)
+
+    def test_hot_page_skips_post_queries(self):
+        """Повторный показ ленты не выбирает посты из базы."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertContains(response, 'Первый текст')
+
+    @override_settings(CACHE_FRAGMENT_TIMEOUT=20)
+    def test_fragments_expire_in_process_local_cache(self):
+        """Без общего кэша фрагмент живёт CACHE_FRAGMENT_TIMEOUT секунд."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        later = time.time() + 30
+        with mock.patch('time.time', return_value=later):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+        self.assertGreater(len(queries), 1)
+
+    def test_writes_invalidate_pages(self):
+        """Правка и удаление поста сразу видны на всех лентах."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ]
+        for url in urls:
+            self.client.get(url)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новый текст')
+        self.post.delete()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), 'Новый текст')
+
+    def test_moving_post_invalidates_old_group(self):
+        url = reverse('posts:group_list', args=[self.group.slug])
+        self.client.get(url)
+        self.post.group = None
+        self.post.save()
+        self.assertNotContains(self.client.get(url), 'Первый текст')
+
+    def test_renames_invalidate_pages_showing_them(self):
+        """Имя автора и название группы обновляются на всех страницах."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        for url in urls:
+            self.client.get(url)
+        self.user.first_name, self.user.last_name = 'Анна', 'Каренина'
+        self.user.save()
+        self.group.title = 'Новое название'
+        self.group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Анна Каренина')
+                self.assertContains(response, 'Новое название')
+
+    def test_comment_invalidates_card(self):
+        """Новый комментарий обновляет счётчик на карточке поста."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user)
+        client = Client()
+        client.force_login(reader)
+        url = reverse('posts:follow_index')
+        self.assertContains(client.get(url), 'Комментариев: 0')
+        Comment.objects.create(post=self.post, author=reader, text='Ок')
+        self.assertContains(client.get(url), 'Комментариев: 1')
+
+
+class CacheAsideTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def test_lookup_is_cached_and_invalidated(self):
+        """Группа читается из кэша до изменения в базе."""
+        posts_cache.get_object_or_404(Group, slug='test-slug')
+        with self.assertNumQueries(0):
+            group = posts_cache.get_object_or_404(Group, slug='test-slug')
+        self.assertEqual(group, self.group)
+        self.group.slug = 'new-slug'
+        self.group.save()
+        with self.assertRaises(Http404):
+            posts_cache.get_object_or_404(Group, slug='test-slug')
+        self.assertEqual(
+            posts_cache.get_object_or_404(Group, slug='new-slug').pk,
+            self.group.pk)
+
+    def test_lookup_is_keyed_by_queryset_shape(self):
+        """Пост с автором и пост без него не делят запись в кэше."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Текст')
+        posts_cache.get_object_or_404(Post, pk=post.pk)
+        with_author = Post.objects.select_related('author', 'group')
+        post = posts_cache.get_object_or_404(with_author, pk=post.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(post.author.username, 'author')
+        author.username = 'renamed'
+        author.save()
+        post = posts_cache.get_object_or_404(with_author, pk=post.pk)
+        self.assertEqual(post.author.username, 'renamed')
+
+    def test_missing_object_creation_is_seen(self):
+        with self.assertRaises(Http404):
+            posts_cache.get_object_or_404(User, username='newcomer')
+        User.objects.create_user(username='newcomer')
+        self.assertEqual(
+            posts_cache.get_object_or_404(User, username='newcomer').username,
+            'newcomer')
+
+    def test_expired_key_is_recomputed_once(self):
+        """Пока один процесс пересчитывает ключ, другие отдают старое."""
+        cache.set('key', ('старое', time.time() - 1), 60)
+        cache.add('key:lock', 1)
+        compute = mock.Mock(return_value='новое')
+        self.assertEqual(posts_cache.get_or_compute('key', compute), 'старое')
+        compute.assert_not_called()
+        cache.delete('key:lock')
+        self.assertEqual(posts_cache.get_or_compute('key', compute), 'новое')
+        self.assertEqual(posts_cache.get_or_compute('key', compute), 'новое')
+        compute.assert_called_once()
+
+
+class CommitBumpTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_generation_changes_again_after_commit(self):
+        """Закэшированное до фиксации записи не читается после неё."""
+        before = posts_cache.get_version(posts_cache.FEED)
+        with transaction.atomic():
+            posts_cache.bump((posts_cache.FEED, None))
+            # параллельный читатель ещё видит старые строки
+            during = posts_cache.get_version(posts_cache.FEED)
+            self.assertNotEqual(during, before)
+        self.assertNotIn(posts_cache.get_version(posts_cache.FEED),
+                         (before, during))
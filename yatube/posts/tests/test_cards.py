@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class CardTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='пи+са.тель@x', first_name='Анна', last_name='<Б>')
+        self.group = Group.objects.create(
+            title='Группа & Co', slug='group-1', description='Описание')
+        self.post = Post.objects.create(
+            text='<script>alert(1)</script>\n\nВторой абзац\nстрока',
+            author=self.author, group=self.group)
+
+    def render(self, template):
+        posts = Post.objects.select_related('author', 'group')
+        return Template('{% load post_cards %}' + template).render(
+            Context({'posts': posts}))
+
+    def test_urls_match_reverse(self):
+        for name, value in (('posts:post_detail', self.post.pk),
+                            ('posts:profile', self.author.username),
+                            ('posts:group_list', self.group.slug)):
+            with self.subTest(name=name):
+                self.assertEqual(cards.url_builder(name)(value),
+                                 reverse(name, args=[value]))
+
+    def test_card_markup(self):
+        html = self.render(
+            '{% for card in posts|post_cards %}{{ card }}{% endfor %}')
+        self.assertIn('Анна &lt;Б&gt;', html)
+        self.assertIn('Группа &amp; Co', html)
+        self.assertIn('<p>&lt;script&gt;alert(1)&lt;/script&gt;</p>', html)
+        self.assertIn('<p>Второй абзац<br>строка</p>', html)
+        self.assertIn(
+            reverse('posts:profile', args=[self.author.username]), html)
+        self.assertIn(reverse('posts:post_detail', args=[self.post.pk]),
+                      html)
+        self.assertNotIn('Комментариев', html)
+
+    def test_comment_count_on_request(self):
+        html = self.render(
+            '{% for card in posts|post_cards:True %}{{ card }}{% endfor %}')
+        self.assertIn('Комментариев: 0', html)
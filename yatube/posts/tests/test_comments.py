@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import comments
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPagesTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        for number in range(7):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{number}'),
+                text=f'Комментарий {number}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_json_pages_newest_first(self):
+        """JSON-выдача отдаёт все комментарии страницами по курсору."""
+        url = reverse('posts:post_comments', args=[self.post.pk])
+        texts, cursor = [], ''
+        while True:
+            data = self.client.get(url, {'cursor': cursor}).json()
+            self.assertLessEqual(len(data['results']), 3)
+            texts.extend(item['text'] for item in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(
+            texts, [f'Комментарий {number}' for number in range(6, -1, -1)])
+
+    def test_authors_are_loaded_with_page(self):
+        page = comments.get_page(self.post)
+        with self.assertNumQueries(1):
+            page = comments.get_page(self.post, page.next_cursor)
+            [comment.author.username for comment in page]
+
+    def test_first_page_is_cached_until_new_comment(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            comments.get_page(self.post)
+        self.client.post(reverse('posts:add_comment', args=[self.post.pk]),
+                         {'text': 'Свежий комментарий'})
+        response = self.client.get(url)
+        self.assertEqual(response.context['comments'][0].text,
+                         'Свежий комментарий')
+        self.assertEqual(len(response.context['comments']), 3)
+        self.assertContains(response, 'Показать ещё комментарии')
+
+    def test_unknown_post_is_404(self):
+        response = self.client.get(
+            reverse('posts:post_comments', args=[self.post.pk + 100]))
+        self.assertEqual(response.status_code, 404)
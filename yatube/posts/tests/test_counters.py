@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import AuthorStats, Comment, Follow, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.post = Post.objects.create(text='Пост', author=self.author)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании и удалении строк."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.reader, text='Коммент')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        stats = AuthorStats.objects.get(user=self.author)
+        self.assertEqual((stats.post_count, stats.follower_count), (1, 1))
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.reader).following_count, 1)
+        comment.delete()
+        follow.delete()
+        self.post.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.post_count, stats.follower_count), (0, 0))
+
+    def test_rebuild_counters_command(self):
+        """Команда восстанавливает разошедшиеся счётчики."""
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Коммент')
+        Post.objects.update(comment_count=7)
+        AuthorStats.objects.update(post_count=7)
+        call_command('rebuild_counters', stdout=open('/dev/null', 'w'))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(
+            AuthorStats.objects.get(user=self.author).post_count, 1)
+
+    def test_feed_pages_do_not_count_per_post(self):
+        """Лента подписок не выполняет COUNT на каждый пост."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for _ in range(5):
+            Post.objects.create(text='Ещё пост', author=self.author)
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:follow_index')
+        client.get(url)
+        with self.assertNumQueries(5):
+            client.get(url)
@@ -0,0 +1,28 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        # Прагмы выполняются при открытии соединения, поэтому проверяем
+        # новое соединение, а не то, что держит транзакцию теста.
+        new_connection = connection.copy()
+        self.addCleanup(new_connection.close)
+        with new_connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_new_connection_gets_pragmas(self):
+        expected = {
+            'busy_timeout': 5000,
+            'synchronous': 1,  # NORMAL
+            'cache_size': -64000,
+            'temp_store': 2,  # MEMORY
+        }
+        for name, value in expected.items():
+            with self.subTest(pragma=name):
+                self.assertEqual(self.pragma(name), value)
+
+    @override_settings(SQLITE_PRAGMAS={'synchronous': 'FULL'})
+    def test_pragmas_come_from_settings(self):
+        self.assertEqual(self.pragma('synchronous'), 2)
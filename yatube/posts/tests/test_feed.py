@@ -0,0 +1,105 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='stranger')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def follow_page_posts(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора попадает в ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=self.user, post=post).exists())
+        self.assertEqual(self.follow_page_posts(), [post])
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        """Подписка добавляет старые посты, отписка убирает их."""
+        post = Post.objects.create(text='Старый пост', author=self.author)
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertEqual(self.follow_page_posts(), [post])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertFalse(FeedEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.follow_page_posts(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_heavy_author_is_merged_on_read(self):
+        """Посты популярного автора подмешиваются в ленту при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.follow_page_posts(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_author_turning_light_backfills_feeds(self):
+        """Посты «тяжёлого» времени попадают в ленты, когда автор лёгкий."""
+        Follow.objects.create(user=self.user, author=self.author)
+        follow = Follow.objects.create(user=self.other, author=self.author)
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.exists())
+        follow.delete()
+        self.assertEqual(
+            list(FeedEntry.objects.values_list('user', 'post')),
+            [(self.user.pk, post.pk)])
+        self.assertEqual(self.follow_page_posts(), [post])
+
+    @override_settings(FEED_FANOUT_LIMIT=2,
+                       CURSOR_PAGINATION_VIEWS={'posts:follow_index'})
+    def test_heavy_author_pages_share_cursor_with_feed(self):
+        """Курсор ленты с «тяжёлым» автором обходит все посты по разу."""
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=self.user, author=self.other)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author)
+            for i in range(12) for author in (self.author, self.other)
+        ]
+        url = reverse('posts:follow_index')
+        seen, cursor = [], None
+        while True:
+            page_obj = self.authorized_client.get(
+                url, {'cursor': cursor} if cursor else None,
+            ).context['page_obj']
+            seen += page_obj.object_list
+            if not page_obj.has_next():
+                break
+            cursor = page_obj.next_cursor
+        self.assertEqual(seen, posts[::-1])
+        previous = self.authorized_client.get(
+            url, {'cursor': page_obj.previous_cursor}).context['page_obj']
+        self.assertEqual(list(previous), posts[::-1][10:20])
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_heavy_author_feed_is_paginated_by_number(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        Follow.objects.create(user=self.user, author=self.other)
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=author)
+            for i in range(8) for author in (self.author, self.other)
+        ]
+        page_obj = self.authorized_client.get(
+            reverse('posts:follow_index'), {'page': 2}).context['page_obj']
+        self.assertEqual(page_obj.paginator.count, len(posts))
+        self.assertEqual(list(page_obj), posts[::-1][10:])
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import follows
+from posts.models import Follow
+
+User = get_user_model()
+
+
+class FollowsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.authors = [User.objects.create_user(username=f'author{number}')
+                        for number in range(5)]
+        for author in self.authors[:3]:
+            Follow.objects.create(user=self.reader, author=author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_one_query_per_request(self):
+        request = self.request(self.reader)
+        with self.assertNumQueries(1):
+            states = [follows.for_request(request).is_following(author.pk)
+                      for author in self.authors]
+        self.assertEqual(states, [True, True, True, False, False])
+        with self.assertNumQueries(0):
+            self.assertIn(self.authors[0].pk,
+                          follows.for_request(self.request(self.reader)))
+
+    def test_anonymous_follows_nobody(self):
+        with self.assertNumQueries(0):
+            self.assertFalse(follows.for_request(
+                self.request(AnonymousUser())).is_following(
+                    self.authors[0].pk))
+
+    def test_follow_views_invalidate(self):
+        author = self.authors[4]
+        follows.for_request(self.request(self.reader))
+        self.client.get(
+            reverse('posts:profile_follow', args=[author.username]))
+        self.assertTrue(follows.for_request(
+            self.request(self.reader)).is_following(author.pk))
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[author.username]))
+        self.assertFalse(follows.for_request(
+            self.request(self.reader)).is_following(author.pk))
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load follow_state %}{% for author in authors %}'
+            '{% is_following author.pk as following %}'
+            '{{ following|yesno:"+,-" }}{% endfor %}')
+        context = Context({'authors': self.authors,
+                           'request': self.request(self.reader)})
+        with self.assertNumQueries(1):
+            self.assertEqual(template.render(context), '+++--')
+
+    def test_profile_button(self):
+        url = reverse('posts:profile', args=[self.authors[0].username])
+        response = self.client.get(url)
+        self.assertTrue(response.context['following'])
+        self.assertContains(response, 'Отписаться')
+        response = self.client.get(
+            reverse('posts:profile', args=[self.authors[4].username]))
+        self.assertContains(response, 'Подписаться')
@@ -2,6 +2,7 @@ import shutil
 import tempfile
 
 from http import HTTPStatus
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -9,6 +10,7 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts.forms import PostForm
 from posts.models import Comment, Group, Post
 
 User = get_user_model()
@@ -141,6 +143,24 @@ class PostFormTest(TestCase):
             ).exists()
         )
 
+    def test_post_edit_keeps_concurrent_columns(self):
+        """Правка не затирает счётчик и миниатюры, записанные без неё."""
+        def write_meanwhile(form):
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='Комментарий')
+            Post.objects.filter(pk=self.post.pk).update(
+                thumbnails='{"image": ""}')
+            return original_clean(form)
+
+        original_clean = PostForm.clean
+        with mock.patch.object(PostForm, 'clean', write_meanwhile):
+            self.authorized_client.post(
+                self.POST_EDIT, data={'text': 'Новый текст'})
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(post.thumbnails, '{"image": ""}')
+
     def test_anonim_client_create_post(self):
         post_count = Post.objects.count()
         response = self.client.post(
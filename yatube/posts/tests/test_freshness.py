@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import parse_http_date
+
+from posts import suggestions
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='writer')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        self.guest = Client()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        )
+
+    def test_anonymous_pages_are_public(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest.get(url)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('s-maxage', response['Cache-Control'])
+                self.assertIn('Cookie', response['Vary'])
+                with self.assertNumQueries(0):
+                    cached = self.guest.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(cached.status_code, 304)
+                cached = self.guest.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(cached.status_code, 304)
+
+    def test_user_pages_are_private(self):
+        anonymous = self.guest.get(self.urls[0])
+        response = self.client.get(self.urls[0])
+        self.assertIn('private', response['Cache-Control'])
+        self.assertNotEqual(response['ETag'], anonymous['ETag'])
+
+    def test_follow_changes_profile(self):
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['following'])
+
+    def test_suggestions_rebuild_changes_profile(self):
+        """Пересчёт рекомендаций меняет валидаторы профиля вошедшего."""
+        url = self.urls[2]
+        etag = self.client.get(url)['ETag']
+        suggestions.rebuild()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_delete_moves_last_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                since = self.guest.get(url)['Last-Modified']
+                post = Post.objects.create(
+                    text='Ещё пост', author=self.author, group=self.group)
+                later = parse_http_date(since) + 5
+                with mock.patch('posts.cache.time.time', return_value=later):
+                    post.delete()
+                response = self.guest.get(url, HTTP_IF_MODIFIED_SINCE=since)
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,103 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import (RequestFactory, SimpleTestCase, TransactionTestCase,
+                         override_settings)
+
+from posts import feed, follows, graph
+from posts.models import FeedEntry, Follow, Post
+
+User = get_user_model()
+
+
+def _pairs(edges):
+    return sorted(edges)
+
+
+@override_settings(FOLLOW_GRAPH_COMPACT_EVERY=7)
+class FollowGraphTests(SimpleTestCase):
+    def assertMatches(self, follow_graph, edges, nodes):
+        for node in nodes:
+            following = sorted(a for u, a in edges if u == node)
+            followers = sorted(u for u, a in edges if a == node)
+            self.assertEqual(list(follow_graph.following(node)), following)
+            self.assertEqual(list(follow_graph.followers(node)), followers)
+            self.assertEqual(follow_graph.following_count(node),
+                             len(following))
+            self.assertEqual(follow_graph.follower_count(node),
+                             len(followers))
+            self.assertEqual(follow_graph.mutuals(node),
+                             sorted(set(following) & set(followers)))
+        self.assertEqual(follow_graph.edges, len(edges))
+
+    def test_matches_edge_set_after_writes(self):
+        rng = random.Random(0)
+        nodes = range(1, 40)
+        edges = {(rng.choice(nodes), rng.choice(nodes)) for _ in range(300)}
+        follow_graph = graph.FollowGraph.from_pairs(_pairs(edges))
+        self.assertMatches(follow_graph, edges, nodes)
+        for _ in range(200):
+            edge = (rng.choice(nodes), rng.choice(range(1, 45)))
+            followed = rng.random() < 0.5
+            follow_graph.apply(*edge, followed)
+            (edges.add if followed else edges.discard)(edge)
+            follow_graph.compact()
+            self.assertEqual(follow_graph.is_following(*edge), followed)
+        self.assertMatches(follow_graph, edges, range(1, 45))
+
+    def test_friends_of_friends(self):
+        follow_graph = graph.FollowGraph.from_pairs(
+            [(1, 2), (1, 3), (2, 4), (2, 5), (3, 1), (3, 4), (3, 2)])
+        self.assertEqual(follow_graph.friends_of_friends(1), [(4, 2), (5, 1)])
+        self.assertEqual(follow_graph.common_following(2, 3), [4])
+        self.assertEqual(follow_graph.common_followers(2, 4), [3])
+
+
+@override_settings(FOLLOW_GRAPH_ENABLED=True)
+class FollowGraphSyncTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        graph.reset()
+        self.reader, self.author, self.other = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author', 'other'))
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        graph.reset()
+
+    def test_writes_reach_loaded_graph_through_log(self):
+        follow_graph = graph.get_graph()
+        self.assertTrue(follow_graph.is_following(self.reader.pk,
+                                                  self.author.pk))
+        Follow.objects.create(user=self.reader, author=self.other)
+        Follow.objects.filter(user=self.reader, author=self.author).delete()
+        with self.assertNumQueries(0):
+            follow_graph = graph.get_graph()
+        self.assertEqual(list(follow_graph.following(self.reader.pk)),
+                         [self.other.pk])
+        self.assertEqual(list(follow_graph.followers(self.other.pk)),
+                         [self.reader.pk])
+
+    def test_lost_log_reloads_graph(self):
+        graph.get_graph()
+        # как import_posts: строки без сигналов, затем очистка кэша
+        Follow.objects.bulk_create(
+            [Follow(user=self.other, author=self.author)])
+        cache.clear()
+        with self.assertNumQueries(1):
+            follow_graph = graph.get_graph()
+        self.assertEqual(follow_graph.follower_count(self.author.pk), 2)
+
+    def test_feed_and_follow_state_use_graph(self):
+        graph.get_graph()
+        request = RequestFactory().get('/')
+        request.user = self.reader
+        with self.assertNumQueries(0):
+            self.assertTrue(
+                follows.for_request(request).is_following(self.author.pk))
+            self.assertEqual(feed.heavy_authors(self.reader), [])
+        post = Post.objects.create(text='Пост', author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
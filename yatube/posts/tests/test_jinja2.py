@@ -0,0 +1,123 @@
+import re
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import engines
+from django.test.signals import template_rendered
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, Suggestion
+
+User = get_user_model()
+
+VIEWS = {'posts:index', 'posts:group_list', 'posts:profile',
+         'posts:follow_index', 'posts:post_detail'}
+_CSRF = re.compile(r'(name="csrfmiddlewaretoken" value=")[^"]+')
+_SPACES = re.compile(r'\s+')
+_TAG_SPACES = re.compile(r' ?([<>]) ?')
+
+
+def normalize(content):
+    # шаблоны расставляют пробелы и переносы по-разному, а в разметке
+    # post_detail лишний </a>, с которым assertHTMLEqual не справляется
+    html = _SPACES.sub(' ', _CSRF.sub(r'\1', content.decode()))
+    return _TAG_SPACES.sub(r'\1', html).strip()
+
+
+@skipUnless(settings.JINJA2_INSTALLED, 'Jinja2 не установлен')
+class Jinja2TemplatesTests(TestCase):
+    maxDiff = None
+
+    def setUp(self):
+        self.author = User.objects.create_user(
+            username='writer', first_name='Анна', last_name='<Б>')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        other = User.objects.create_user(username='other', first_name='Ян')
+        Suggestion.objects.create(user=self.reader, author=other, score=2)
+        Suggestion.objects.create(user=self.author, author=self.reader,
+                                  score=1)
+        self.group = Group.objects.create(
+            title='Группа & Co', slug='group', description='<Описание>')
+        self.post = Post.objects.create(
+            text='Первый пост\n\nвторой абзац', author=self.author,
+            group=self.group)
+        Post.objects.bulk_create(
+            Post(text=f'Пост {number}', author=self.author,
+                 group=self.group if number % 2 else None)
+            for number in range(12))
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='<b>Комментарий</b>')
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def render(self, client, url, views):
+        # фрагменты лент у движков общие, поэтому кэш чистится
+        cache.clear()
+        with override_settings(JINJA2_VIEWS=views):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def assertSameHTML(self, client, url):
+        django = self.render(client, url, set())
+        jinja2 = self.render(client, url, VIEWS)
+        self.assertTrue(jinja2.templates[0].filename.endswith(
+            f'jinja2/{django.templates[0].name}'))
+        self.assertEqual(normalize(jinja2.content),
+                         normalize(django.content))
+
+    def test_pages_match_django_templates(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:index') + '?page=2',
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for client in (self.guest, self.reader_client, self.author_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertSameHTML(client, url)
+        self.assertSameHTML(self.reader_client,
+                            reverse('posts:follow_index'))
+        self.assertContains(
+            self.render(self.reader_client, reverse('posts:follow_index'),
+                        VIEWS), 'Кого почитать')
+
+    @override_settings(CURSOR_PAGINATION_VIEWS={'posts:index'})
+    def test_cursor_pages_match_django_templates(self):
+        first = self.render(self.guest, reverse('posts:index'), set())
+        cursor = first.context['page_obj'].next_cursor
+        self.assertSameHTML(self.guest, reverse('posts:index'))
+        self.assertSameHTML(self.guest,
+                            reverse('posts:index') + f'?cursor={cursor}')
+
+    @override_settings(PAGE_CACHE_ENABLED=True, JINJA2_VIEWS=VIEWS)
+    def test_page_cache_fills_holes(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.author_client.get(url)
+        response = self.reader_client.get(url)
+        self.assertContains(response, 'Отписаться')
+        self.assertContains(response, 'Пользователь:')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_signal_only_under_test_runner(self):
+        """Вне тестов рендер Jinja2 не шлёт template_rendered."""
+        from yatube.jinja2 import Template
+        template = engines['jinja2'].from_string('{{ value }}')
+        receiver = mock.Mock()
+        template_rendered.connect(receiver)
+        self.addCleanup(template_rendered.disconnect, receiver)
+        self.assertEqual(template.render({'value': 1}), '1')
+        receiver.assert_called_once()
+        receiver.reset_mock()
+        with mock.patch.object(Template, 'render', Template._original_render):
+            self.assertEqual(template.render({'value': 2}), '2')
+        receiver.assert_not_called()
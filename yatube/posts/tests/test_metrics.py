@@ -0,0 +1,111 @@
+import socket
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts.models import Comment, Follow, Group, Post, Suggestion
+
+User = get_user_model()
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов страниц не растёт вместе с числом постов."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.groups = [
+            Group.objects.create(title=f'Группа {number}',
+                                 slug=f'group-{number}', description='-')
+            for number in range(3)
+        ]
+        cls.authors = [User.objects.create_user(username=f'author{number}')
+                       for number in range(4)]
+        for number in range(12):
+            post = Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.authors[number % 4],
+                group=cls.groups[number % 3])
+            Comment.objects.create(post=post, author=cls.reader, text='Ок')
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        # рекомендации добавляют запрос в профиль и ленту подписок
+        other = User.objects.create_user(username='other')
+        Suggestion.objects.create(user=cls.reader, author=other, score=1)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_views_fit_query_budget(self):
+        urls = (
+            ('posts:index', reverse('posts:index')),
+            ('posts:group_list', reverse('posts:group_list',
+                                         args=['group-0'])),
+            ('posts:profile', reverse('posts:profile', args=['author0'])),
+            ('posts:profile', reverse('posts:profile', args=['other'])),
+            ('posts:post_detail', reverse(
+                'posts:post_detail', args=[Post.objects.first().pk])),
+            ('posts:follow_index', reverse('posts:follow_index')),
+        )
+        for view_name, url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.metrics.view_name, view_name)
+                self.assertLessEqual(response.metrics.queries,
+                                     settings.QUERY_BUDGETS[view_name])
+                self.assertEqual(response.metrics.repeated_queries(), {})
+
+    def test_cache_and_template_time_are_recorded(self):
+        url = reverse('posts:index')
+        first = self.client.get(url).metrics
+        second = self.client.get(url).metrics
+        self.assertGreater(first.cache_misses, 0)
+        self.assertGreater(second.cache_hits, first.cache_hits)
+        self.assertGreater(first.template_time, 0)
+        self.assertLess(second.queries, first.queries)
+
+    @override_settings(QUERY_BUDGETS={'posts:index': 1})
+    def test_overrun_fails_under_tests(self):
+        with self.assertRaisesMessage(metrics.QueryBudgetExceeded,
+                                      'posts:index'):
+            self.client.get(reverse('posts:index'))
+
+
+class RepeatedQueryTests(TestCase):
+    def test_same_shape_is_reported(self):
+        """Запросы, отличающиеся только параметрами, считаются одной формой."""
+        user = User.objects.create_user(username='writer')
+        request_metrics = metrics.start('test')
+        with connection.execute_wrapper(metrics.query_wrapper):
+            for pk in range(settings.METRICS_REPEATED_QUERY_THRESHOLD):
+                Post.objects.filter(author=user, pk=pk).exists()
+            Post.objects.filter(pk__in=[1, 2, 3]).exists()
+            Post.objects.filter(pk__in=[1, 2]).exists()
+        metrics.stop()
+        repeated = request_metrics.repeated_queries()
+        self.assertEqual(list(repeated.values()),
+                         [settings.METRICS_REPEATED_QUERY_THRESHOLD])
+        self.assertEqual(
+            metrics.query_shape('SELECT 1 FROM t WHERE id IN (%s, %s)'),
+            metrics.query_shape("SELECT 2 FROM t WHERE id IN (3, 'x', 5)"))
+
+    def test_statsd_sink_sends_datagram(self):
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(('127.0.0.1', 0))
+        receiver.settimeout(2)
+        self.addCleanup(receiver.close)
+        sink = metrics.StatsdSink(f'127.0.0.1:{receiver.getsockname()[1]}')
+        request_metrics = metrics.RequestMetrics('posts:index')
+        request_metrics.queries = 3
+        sink.emit(request_metrics)
+        data = receiver.recv(4096).decode()
+        self.assertIn('yatube.posts.index.queries:3|h', data)
+        self.assertEqual(data.count(':'), data.count('\n') + 1)
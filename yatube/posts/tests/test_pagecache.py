@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(PAGE_CACHE_ENABLED=True)
+class PageCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='writer')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            text='Первый пост', author=self.author, group=self.group)
+        self.guest = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_page_skips_view(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest.get(url)
+                with self.assertNumQueries(0):
+                    second = self.guest.get(url)
+                self.assertIsNone(second.context)
+                self.assertEqual(second.content, first.content)
+
+    def test_post_write_invalidates_page(self):
+        url = reverse('posts:index')
+        self.guest.get(url)
+        Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertContains(self.guest.get(url), 'Свежий пост')
+
+    def test_holes_filled_per_user(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author_client.get(url)
+        response = self.reader_client.get(url)
+        self.assertIsNone(response.context.get('page_obj'))
+        self.assertContains(response, 'Пользователь:')
+        self.assertContains(response, 'Отписаться')
+        self.assertNotContains(response, '<!--hole:')
+        response = self.author_client.get(url)
+        self.assertContains(response, 'Подписаться')
+        self.assertContains(response, reverse('posts:post_create'))
+
+    def test_post_actions_hole(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.reader_client.get(url)
+        response = self.author_client.get(url)
+        self.assertContains(
+            response, reverse('posts:post_edit', args=[self.post.pk]))
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        response = self.reader_client.get(url)
+        self.assertNotContains(
+            response, reverse('posts:post_edit', args=[self.post.pk]))
+        self.assertNotContains(self.guest.get(url), 'csrfmiddlewaretoken')
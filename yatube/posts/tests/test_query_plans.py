@@ -0,0 +1,105 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\S+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN из SQLite')
+class QueryPlanTests(TestCase):
+    """Запросы страниц не сканируют таблицы целиком и не сортируют в памяти.
+
+    План каждого SQL-запроса, выполненного view, проверяется через
+    ``EXPLAIN QUERY PLAN``.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group)
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Коммент')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def get_plans(self, url, data=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans[query['sql']] = [row[-1] for row in cursor.fetchall()]
+        return response, plans
+
+    def assert_indexed(self, url, data=None):
+        response, plans = self.get_plans(url, data)
+        for sql, plan in plans.items():
+            with self.subTest(url=url, sql=sql):
+                for step in plan:
+                    self.assertNotRegex(step, FULL_SCAN)
+                    self.assertNotIn(TEMP_SORT, step)
+        return response
+
+    def test_page_queries_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            self.assert_indexed(url)
+
+    @override_settings(CURSOR_PAGINATION_VIEWS={
+        'posts:index', 'posts:group_list', 'posts:profile',
+        'posts:follow_index'})
+    def test_cursor_page_queries_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            page_obj = self.assert_indexed(url).context['page_obj']
+            self.assert_indexed(url, {'cursor': page_obj.next_cursor})
+
+    @override_settings(FEED_FANOUT_LIMIT=2)
+    def test_heavy_author_feed_queries_use_indexes(self):
+        """Лента с «тяжёлым» автором читает каждый источник по индексу."""
+        light = User.objects.create_user(username='light')
+        Follow.objects.create(user=self.reader, author=light)
+        Follow.objects.create(user=light, author=self.author)
+        Post.objects.create(text='Лёгкий пост', author=light)
+        url = reverse('posts:follow_index')
+        self.assert_indexed(url)
+        self.assert_indexed(url, {'page': 2})
+        with self.settings(CURSOR_PAGINATION_VIEWS={'posts:follow_index'}):
+            page_obj = self.assert_indexed(url).context['page_obj']
+            self.assert_indexed(url, {'cursor': page_obj.next_cursor})
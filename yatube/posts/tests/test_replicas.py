@@ -0,0 +1,105 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import routers
+from core.routers import ReplicaRouter
+from posts.models import Post
+
+User = get_user_model()
+db_for_read = ReplicaRouter.db_for_read
+
+
+@override_settings(DATABASE_READ_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(TestCase):
+    """Реплики подменяются на default: проверяется только выбор базы."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.reads = []
+        patcher = mock.patch.object(
+            ReplicaRouter, 'db_for_read', autospec=True,
+            side_effect=self.record_read)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def record_read(self, router, model, **hints):
+        self.reads.append(db_for_read(router, model, **hints))
+        return 'default'
+
+    def get(self, url):
+        self.reads.clear()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return set(self.reads)
+
+    def test_read_views_use_one_replica(self):
+        databases = self.get(reverse('posts:post_detail',
+                                     args=[self.post.pk]))
+        self.assertEqual(len(databases), 1)
+        self.assertIn(databases.pop(), settings.DATABASE_READ_REPLICAS)
+
+    def test_other_views_read_primary(self):
+        self.assertEqual(self.get(reverse('posts:post_create')),
+                         {'default'})
+
+    def test_write_pins_user_to_primary(self):
+        """После записи пользователь какое-то время читает основную базу."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'})
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        self.assertEqual(self.get(url), {'default'})
+        self.client.cookies[settings.REPLICA_STICKY_COOKIE] = '0'
+        self.assertNotIn('default', self.get(url))
+
+    def test_replica_reads_are_not_cached(self):
+        """Отстающая реплика не попадает в кэш и не получает ETag."""
+        post_url = reverse('posts:post_detail', args=[self.post.pk])
+        profile_url = reverse('posts:profile', args=[self.user.username])
+        first, second = self.client.get(post_url), self.client.get(post_url)
+        self.assertEqual(second.metrics.queries, first.metrics.queries)
+        self.assertFalse(self.client.get(profile_url).has_header('ETag'))
+        self.assertFalse(routers.reading_replica())
+        self.client.cookies[settings.REPLICA_STICKY_COOKIE] = str(
+            int(time.time()) + settings.REPLICA_STICKY_SECONDS)
+        first, second = self.client.get(post_url), self.client.get(post_url)
+        self.assertLess(second.metrics.queries, first.metrics.queries)
+        self.assertTrue(self.client.get(profile_url).has_header('ETag'))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'replica_test_cache',
+    }})
+    def test_database_cache_does_not_pin_user(self):
+        """Кэш в таблице живёт в основной базе и не закрепляет за ней."""
+        call_command('createcachetable', verbosity=0)
+        routers.use_replica()
+        self.addCleanup(routers.release_replica)
+        routers.reset_writes()
+        self.reads.clear()
+        cache.set('key', 'value')
+        self.assertEqual(cache.get('key'), 'value')
+        self.assertFalse(routers.has_written())
+        self.assertEqual(set(self.reads), {'default'})
+
+    def test_replicas_are_not_migrated(self):
+        router = ReplicaRouter()
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
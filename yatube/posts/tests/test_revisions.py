@@ -0,0 +1,86 @@
+import random
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import revisions
+from posts.models import Post
+
+User = get_user_model()
+
+WORDS = ('кот', 'пёс', 'дом', 'лес', 'река', 'город', 'мост', '—', '\n')
+
+
+class RevisionTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='writer')
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.post = Post.objects.create(text='Первая версия текста',
+                                        author=self.author)
+
+    def edit(self, text):
+        self.client.post(reverse('posts:post_edit', args=[self.post.pk]),
+                         {'text': text})
+        self.post.refresh_from_db()
+
+    def test_edit_records_revision_and_updated_at(self):
+        updated_at = self.post.updated_at
+        self.edit('Вторая версия текста')
+        revision = self.post.revisions.get()
+        self.assertEqual(revision.number, 1)
+        self.assertEqual(revision.editor, self.author)
+        self.assertGreater(self.post.updated_at, updated_at)
+        self.assertEqual(revisions.get_text(self.post, 1),
+                         'Первая версия текста')
+
+    def test_unchanged_text_adds_no_revision(self):
+        self.edit(self.post.text)
+        self.assertFalse(self.post.revisions.exists())
+
+    @override_settings(REVISION_SNAPSHOT_EVERY=4)
+    def test_all_versions_restored(self):
+        rng = random.Random(0)
+        words = [rng.choice(WORDS) for _ in range(200)]
+        versions = [self.post.text]
+        for _ in range(10):
+            for _ in range(rng.randint(1, 5)):
+                words[rng.randrange(len(words))] = rng.choice(WORDS)
+            text = ' '.join(words)
+            self.edit(text)
+            versions.append(text)
+        self.assertTrue(self.post.revisions.filter(snapshot=True).exists())
+        for number, text in enumerate(versions, start=1):
+            with self.subTest(number=number):
+                self.assertEqual(revisions.get_text(self.post, number), text)
+
+    def test_small_edit_of_long_post_is_compact(self):
+        text = ' '.join(['слово'] * 2000)
+        self.edit(text)
+        self.edit(text.replace('слово', 'правка', 1))
+        revision = self.post.revisions.get(number=2)
+        self.assertFalse(revision.snapshot)
+        self.assertLess(len(revision.delta), 40)
+
+    def test_history_shows_diff(self):
+        self.edit('Вторая версия текста')
+        response = Client().get(
+            reverse('posts:post_history', args=[self.post.pk]))
+        self.assertEqual(response.context['number'], 1)
+        self.assertIn(('delete', 'Первая'), response.context['diff'])
+        self.assertIn(('insert', 'Вторая'), response.context['diff'])
+        self.assertContains(response, '<del class="text-danger">Первая</del>',
+                            html=True)
+        missing = Client().get(
+            reverse('posts:post_history', args=[self.post.pk]),
+            {'version': 5})
+        self.assertEqual(missing.status_code, 404)
+
+    def test_edit_refreshes_feed_card(self):
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигнала')
+        self.assertNotContains(self.client.get(url), 'Без сигнала')
+        self.edit('Новая версия')
+        self.assertContains(self.client.get(url), 'Новая версия')
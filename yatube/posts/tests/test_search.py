@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import search, stemmer
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class StemmerTests(TestCase):
+    def test_word_forms_share_stem(self):
+        for forms in (('ваза', 'вазы', 'вазами'),
+                      ('новость', 'новостей', 'новостями'),
+                      ('хороший', 'хорошему', 'хорошая')):
+            with self.subTest(forms=forms):
+                self.assertEqual(len({stemmer.stem(word) for word in forms}),
+                                 1)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer')
+        self.group = Group.objects.create(
+            title='Новости науки', slug='science', description='Описание')
+        self.post = Post.objects.create(
+            text='Учёные открыли новые <b>звёзды</b> в галактике',
+            author=self.user, group=self.group)
+        self.other = Post.objects.create(
+            text='Рецепт пирога с вишней', author=self.user)
+        self.comment = Comment.objects.create(
+            post=self.other, author=self.user, text='Звезда этого рецепта')
+
+    def kinds(self, query):
+        return {(result.kind, result.object.pk)
+                for result in search.search(query)}
+
+    def test_stemming_and_prefix(self):
+        """Находятся другие формы слова и начало слова."""
+        self.assertIn(('post', self.post.pk), self.kinds('звезда'))
+        self.assertIn(('comment', self.comment.pk), self.kinds('звёзды'))
+        self.assertEqual(self.kinds('галак'), {('post', self.post.pk)})
+        self.assertEqual(self.kinds('новость'),
+                         {('group', self.group.pk)})
+
+    def test_index_follows_writes(self):
+        self.post.text = 'Текст без небесных тел'
+        self.post.save()
+        self.assertNotIn(('post', self.post.pk), self.kinds('звезда'))
+        self.comment.delete()
+        self.assertEqual(self.kinds('звезда'), set())
+
+    def test_keyset_pages(self):
+        """Страницы по курсору не повторяются и не теряют результатов."""
+        for number in range(5):
+            Post.objects.create(text=f'Пост про кошку номер {number}',
+                                author=self.user)
+        seen = []
+        page = search.search('кошки', per_page=2)
+        while True:
+            seen.extend(result.object.pk for result in page)
+            if not page.has_next():
+                break
+            page = search.search('кошки', page.next_cursor, per_page=2)
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_view_highlights_escaped_snippet(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'звёзды'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertContains(response, '<mark>звёзды</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+        self.assertContains(self.client.get(reverse('posts:search')), 'Поиск')
+
+    def test_query_uses_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'EXPLAIN QUERY PLAN SELECT rowid FROM {search.TABLE} '
+                f'WHERE {search.TABLE} MATCH %s',
+                [search.build_query('звезда')])
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('VIRTUAL TABLE INDEX', plan)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'звезда'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post])
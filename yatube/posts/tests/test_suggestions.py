@@ -0,0 +1,168 @@
+import random
+from collections import Counter
+from io import StringIO
+from math import sqrt
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import Follow, Suggestion
+
+User = get_user_model()
+
+
+def expected_scores(edges, max_followers):
+    """Оценки из описания posts.suggestions, посчитанные в лоб."""
+    following, followers = {}, {}
+    for user_id, author_id in edges:
+        following.setdefault(user_id, set()).add(author_id)
+        followers.setdefault(author_id, set()).add(user_id)
+    kept = {author_id for author_id, users in followers.items()
+            if len(users) <= max_followers}
+
+    def similarity(first, second):
+        if first == second or not {first, second} <= kept:
+            return 0
+        common = len(followers[first] & followers[second])
+        return common / sqrt(len(followers[first]) * len(followers[second]))
+
+    result = {}
+    for user_id, authors in following.items():
+        scores = Counter()
+        for author_id in authors:
+            scores.update(following.get(author_id, ()))
+            for other in kept:
+                scores[other] += similarity(author_id, other)
+        result[user_id] = {
+            author_id: score for author_id, score in scores.items()
+            if score and author_id != user_id and author_id not in authors}
+    return result
+
+
+def computed_scores(edges, top_k=1000, **options):
+    result = {}
+    follows = suggestions.follow_matrix(sorted(edges))
+    for users, authors, scores in suggestions.suggest(
+            follows, top_k, neighbours=1000, **options):
+        for user_id, author_id, score in zip(users, authors, scores):
+            result.setdefault(int(user_id), {})[int(author_id)] = score
+    return result
+
+
+class SuggestTests(SimpleTestCase):
+    def assertScoresEqual(self, computed, expected):
+        self.assertEqual(computed.keys() - expected.keys(), set())
+        for user_id, scores in expected.items():
+            if not scores:
+                continue
+            self.assertEqual(computed[user_id].keys(), scores.keys())
+            for author_id, score in scores.items():
+                self.assertAlmostEqual(
+                    computed[user_id][author_id], score, places=4)
+
+    def test_matches_definition(self):
+        rng = random.Random(0)
+        edges = {(rng.randrange(1, 30), rng.randrange(1, 35))
+                 for _ in range(200)}
+        edges = {(user_id, author_id) for user_id, author_id in edges
+                 if user_id != author_id}
+        for max_followers in (3, 100):
+            with self.subTest(max_followers=max_followers):
+                self.assertScoresEqual(
+                    computed_scores(edges, max_followers=max_followers),
+                    expected_scores(edges, max_followers))
+        self.assertScoresEqual(
+            computed_scores(edges, max_followers=100, block_entries=1),
+            expected_scores(edges, 100))
+
+    def test_top_k_keeps_best_scores(self):
+        rng = random.Random(1)
+        edges = {(rng.randrange(1, 30), rng.randrange(1, 35))
+                 for _ in range(300)} - {(n, n) for n in range(35)}
+        full = computed_scores(edges)
+        for user_id, scores in computed_scores(edges, top_k=3).items():
+            best = sorted(full[user_id].values(), reverse=True)[:3]
+            self.assertEqual(sorted(scores.values(), reverse=True), best)
+
+    def test_friends_of_friends(self):
+        follows = suggestions.follow_matrix(
+            [(1, 2), (1, 3), (2, 4), (2, 5), (3, 1), (3, 4), (3, 2)])
+        [(users, authors, scores)] = suggestions.suggest(
+            follows, 5, cofollow_weight=0)
+        self.assertEqual(
+            list(zip(users.tolist(), authors.tolist(), scores.tolist())),
+            [(1, 4, 2.0), (1, 5, 1.0), (3, 5, 1.0)])
+
+
+class SuggestionPagesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader, self.friend, self.neighbour, self.author, self.other = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'friend', 'neighbour', 'author', 'other'))
+        for user, author in ((self.reader, self.friend),
+                             (self.reader, self.neighbour),
+                             (self.friend, self.author),
+                             (self.friend, self.other),
+                             (self.neighbour, self.author)):
+            Follow.objects.create(user=user, author=author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_command_stores_top_k(self):
+        call_command('build_suggestions', '--top-k', '1', stdout=StringIO())
+        self.assertEqual(
+            list(Suggestion.objects.values_list('user', 'author')),
+            [(self.reader.pk, self.author.pk),
+             (self.neighbour.pk, self.other.pk)])
+        call_command('build_suggestions', stdout=StringIO())
+        self.assertEqual(
+            list(Suggestion.objects.values_list('user', 'author')),
+            [(self.reader.pk, self.author.pk),
+             (self.reader.pk, self.other.pk),
+             (self.neighbour.pk, self.other.pk)])
+
+    def test_pages_show_suggestions(self):
+        suggestions.rebuild()
+        urls = (reverse('posts:profile', args=[self.friend.username]),
+                reverse('posts:follow_index'))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Кого почитать')
+                self.assertContains(response, reverse(
+                    'posts:profile_follow', args=[self.author.username]))
+        self.assertNotContains(Client().get(urls[0]), 'Кого почитать')
+
+    def test_followed_author_leaves_suggestions(self):
+        suggestions.rebuild()
+        url = reverse('posts:follow_index')
+        self.client.get(url)
+        self.client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        response = self.client.get(url)
+        self.assertNotContains(response, reverse(
+            'posts:profile_follow', args=[self.author.username]))
+        self.assertContains(response, reverse(
+            'posts:profile_follow', args=[self.other.username]))
+
+    def test_rebuild_replaces_cached_suggestions(self):
+        url = reverse('posts:follow_index')
+        self.assertNotContains(self.client.get(url), 'Кого почитать')
+        suggestions.rebuild()
+        self.assertContains(self.client.get(url), 'Кого почитать')
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cache_fills_suggestions_per_user(self):
+        suggestions.rebuild()
+        url = reverse('posts:profile', args=[self.other.username])
+        friend_client = Client()
+        friend_client.force_login(self.friend)
+        self.assertNotContains(friend_client.get(url), 'Кого почитать')
+        response = self.client.get(url)
+        self.assertIsNone(response.context.get('page_obj'))
+        self.assertContains(response, 'Кого почитать')
@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images, thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPipelineTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='writer')
+
+    def create_post(self):
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_upload_is_queued_after_commit(self):
+        with mock.patch('posts.thumbnails.transaction') as transaction:
+            post = self.create_post()
+        transaction.on_commit.assert_called_once()
+        thumbnails.render(post.pk, post.image.name)
+        post.refresh_from_db()
+        post.text = 'Правка без новой картинки'
+        with mock.patch('posts.thumbnails.transaction') as transaction:
+            post.save()
+        transaction.on_commit.assert_not_called()
+
+    def test_page_shows_placeholder_until_rendered(self):
+        """Пока миниатюры нет, страница показывает заглушку."""
+        post = self.create_post()
+        url = reverse('posts:post_detail', args=[post.pk])
+        self.assertContains(self.client.get(url), 'Изображение обрабатывается')
+        updated_at = post.updated_at
+        thumbnails.render(post.pk, post.image.name)
+        post.refresh_from_db()
+        self.assertIsNotNone(post.thumbnail_url)
+        response = self.client.get(url)
+        self.assertContains(response, post.thumbnail_url)
+        self.assertNotContains(response, 'Изображение обрабатывается')
+        # миниатюры не считаются правкой поста
+        self.assertEqual(post.updated_at, updated_at)
+
+    def test_replaced_image_drops_old_thumbnails(self):
+        post = self.create_post()
+        thumbnails.render(post.pk, post.image.name)
+        post.refresh_from_db()
+        post.image = SimpleUploadedFile('other.gif', SMALL_GIF, 'image/gif')
+        post.save()
+        self.assertIsNone(post.thumbnail_url)
+
+    def test_variants_render_picture_markup(self):
+        """Варианты всех ширин попадают в srcset тега <picture>."""
+        post = self.create_post()
+        thumbnails.render(post.pk, post.image.name)
+        post.refresh_from_db()
+        self.assertIn('jpeg', post.image_variants)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk]))
+        self.assertContains(response, '<picture>')
+        for width in settings.IMAGE_VARIANT_WIDTHS:
+            self.assertContains(response, f'-{width}w.jpeg {width}w')
+
+    @override_settings(IMAGE_VARIANT_FORMATS=('webp', 'jpeg'),
+                       IMAGE_VARIANT_WIDTHS=(320,))
+    def test_unsupported_formats_are_skipped(self):
+        post = self.create_post()
+        with mock.patch.dict(Image.SAVE):
+            Image.SAVE.pop('WEBP', None)
+            variants = images.generate_variants(post.image.name)
+        self.assertEqual(list(variants), ['jpeg'])
+        self.assertEqual(variants['jpeg'][0][0], 320)
@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models.query import QuerySet
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, FeedEntry, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='writer')
+        self.reader = User.objects.create_user(username='читатель')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание, "в кавычках"')
+        self.posts = [
+            Post.objects.create(text=f'Пост {number}\nвторая строка',
+                                author=self.author,
+                                group=self.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Comment.objects.create(post=self.posts[0], author=self.reader,
+                               text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def snapshot(self):
+        return {
+            'groups': list(Group.objects.values_list(
+                'pk', 'title', 'slug', 'description')),
+            'posts': list(Post.objects.order_by('pk').values_list(
+                'pk', 'text', 'pub_date', 'updated_at', 'author__username',
+                'group_id', 'image')),
+            'comments': list(Comment.objects.values_list(
+                'pk', 'post_id', 'author__username', 'text', 'created')),
+            'follows': list(Follow.objects.values_list(
+                'user__username', 'author__username')),
+        }
+
+    def wipe(self):
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+
+    def round_trip(self, export, source):
+        expected = self.snapshot()
+        call_command('export_posts', *export, stderr=io.StringIO())
+        self.wipe()
+        output = io.StringIO()
+        call_command('import_posts', source, '--batch-size', '2',
+                     stdout=output)
+        self.assertEqual(self.snapshot(), expected)
+        self.assertIn('строк/с', output.getvalue())
+
+    def test_ndjson_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.ndjson')
+            self.round_trip(['--output', path], path)
+            with open(path) as stream:
+                first = json.loads(stream.readline())
+        self.assertEqual(first['model'], 'group')
+
+    def test_import_keeps_auto_now_for_other_writers(self):
+        """Даты возвращаются после вставки, поля модели не переключаются."""
+        flags = []
+        bulk_create = QuerySet.bulk_create
+
+        def spy(queryset, *args, **kwargs):
+            flags.append(Post._meta.get_field('updated_at').auto_now)
+            return bulk_create(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'bulk_create', spy):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'dump.ndjson')
+                self.round_trip(['--output', path], path)
+        self.assertTrue(flags)
+        self.assertTrue(all(flags))
+
+    def test_csv_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.round_trip(['--format', 'csv', '--output', directory],
+                            directory)
+
+    def test_import_rebuilds_derived_data(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.ndjson')
+            call_command('export_posts', '--output', path,
+                         stderr=io.StringIO())
+            self.wipe()
+            call_command('import_posts', path, stdout=io.StringIO())
+        author = User.objects.get(username='writer')
+        self.assertFalse(author.has_usable_password())
+        self.assertEqual(AuthorStats.objects.get(user=author).post_count, 5)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).comment_count,
+                         1)
+        self.assertEqual(FeedEntry.objects.count(), 5)
+        new = Post.objects.create(text='Новый', author=author)
+        self.assertGreater(new.pk, self.posts[-1].pk)
+
+    def test_ignore_conflicts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'dump.ndjson')
+            call_command('export_posts', '--output', path,
+                         stderr=io.StringIO())
+            call_command('import_posts', path, '--ignore-conflicts',
+                         stdout=io.StringIO())
+        self.assertEqual(Post.objects.count(), 5)
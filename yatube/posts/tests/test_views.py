@@ -1,3 +1,5 @@
+import base64
+import json
 import shutil
 import tempfile
 
@@ -5,10 +7,11 @@ from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.models import Group, Post
+from posts.utils import decode_cursor
 
 User = get_user_model()
 
@@ -25,6 +28,7 @@ SMALL_GIF = (
 )
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -214,3 +218,55 @@ class PaginatorTests(TestCase):
         )
         self.assertEqual(len(
             response.context['page_obj']), settings.NUMBER_POST)
+
+
+@override_settings(CURSOR_PAGINATION_VIEWS={'posts:index',
+                                            'posts:group_list'})
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовая группа',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст {i}', author=cls.user, group=cls.group)
+            for i in range(settings.SAMPLING + settings.NUMBER_POST)
+        )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def test_pages_follow_cursors(self):
+        """Курсоры ведут на следующую и обратно на предыдущую страницу."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first = self.client.get(url).context['page_obj']
+        self.assertEqual(list(first), self.posts[:settings.SAMPLING])
+        self.assertFalse(first.has_previous())
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(list(second), self.posts[settings.SAMPLING:])
+        self.assertFalse(second.has_next())
+        back = self.client.get(
+            url, {'cursor': second.previous_cursor}).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.client.get(reverse('posts:index'), {'cursor': '!!'})
+        self.assertEqual(len(response.context['page_obj']),
+                         settings.SAMPLING)
+        self.assertContains(response, '?cursor=')
+
+    def test_crafted_cursor_returns_first_page(self):
+        for position in (['next', '2020-01-01T00:00:00', 'x'],
+                         ['next', '2020-01-01T00:00:00', [1]],
+                         ['next', 1, 1], 'next'):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps(position).encode()).decode()
+            with self.subTest(position=position):
+                self.assertIsNone(decode_cursor(cursor))
+                response = self.client.get(reverse('posts:index'),
+                                           {'cursor': cursor})
+                self.assertEqual(len(response.context['page_obj']),
+                                 settings.SAMPLING)
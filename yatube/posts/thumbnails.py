@@ -0,0 +1,80 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+После сохранения поста с новой картинкой все размеры из
+``settings.THUMBNAIL_SIZES`` и адаптивные варианты из ``posts.images``
+рендерятся в пуле потоков, а их адреса
+записываются в ``Post.thumbnails``. Шаблоны берут готовые адреса из модели
+и не обращаются к хранилищу sorl во время показа страницы.
+"""
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import cache, images
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def schedule(post):
+    """Поставить картинку поста в очередь после фиксации транзакции."""
+    pk, name = post.pk, post.image.name
+    # База SQLite в памяти (тесты) доступна потокам только через общий
+    # кэш с табличными блокировками, поэтому там рендерим без пула.
+    in_memory = (connection.vendor == 'sqlite'
+                 and connection.is_in_memory_db())
+    if settings.THUMBNAIL_WORKERS and not in_memory:
+        transaction.on_commit(lambda: get_executor().submit(_run, pk, name))
+    else:
+        transaction.on_commit(lambda: _render_logged(pk, name))
+
+
+def render(pk, name):
+    """Создать все размеры и варианты и сохранить их адреса в посте."""
+    sizes = {
+        size: get_thumbnail(name, geometry, **options).url
+        for size, (geometry, options) in settings.THUMBNAIL_SIZES.items()
+    }
+    thumbnails = json.dumps({
+        'image': name,
+        'sizes': sizes,
+        'variants': images.generate_variants(name),
+    })
+    # Картинку могли заменить, пока шла обработка: тогда запись устарела.
+    # update() не трогает auto_now: миниатюры — не правка поста.
+    updated = Post.objects.filter(pk=pk, image=name).update(
+        thumbnails=thumbnails)
+    if updated:
+        post = Post.objects.get(pk=pk)
+        cache.bump(*cache.post_scopes(post))
+        cache.forget_object(Post, 'pk', pk)
+
+
+def _render_logged(pk, name):
+    try:
+        render(pk, name)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для поста %s', pk)
+
+
+def _run(pk, name):
+    try:
+        _render_logged(pk, name)
+    finally:
+        connection.close()
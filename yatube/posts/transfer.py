@@ -0,0 +1,259 @@
+"""Потоковые выгрузка и загрузка групп, постов, комментариев и подписок.
+
+Формат NDJSON — одна запись на строку с полем ``model``, все модели в одном
+потоке; CSV — по файлу ``<model>.csv`` на модель в каталоге. Записи идут в
+порядке ``MODELS``, чтобы при загрузке строки, на которые ссылаются,
+появлялись раньше ссылок. Авторы записываются по username: при загрузке
+недостающие пользователи создаются без пароля.
+
+Выгрузка читает базу через ``.iterator(chunk_size=...)``, загрузка
+вставляет пачки через ``bulk_create``, сохраняя первичные ключи, так что
+память не растёт с объёмом данных. ``bulk_create`` ставит полям
+``auto_now`` и ``auto_now_add`` текущее время, поэтому даты из выгрузки
+возвращаются следом через ``UPDATE``. Сигналы при этом не срабатывают, и
+счётчики, ленты и поисковый индекс после загрузки пересчитываются целиком.
+"""
+import csv
+import datetime
+import json
+import os
+import time
+from contextlib import contextmanager
+from itertools import groupby
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from . import counters, feed, search
+from .models import Comment, Follow, Group, Post, User
+from .utils import batched
+
+MODELS = {
+    'group': (Group, ('id', 'title', 'slug', 'description')),
+    'post': (Post, ('id', 'text', 'pub_date', 'updated_at', 'author',
+                    'group', 'image')),
+    'comment': (Comment, ('id', 'post', 'author', 'text', 'created')),
+    'follow': (Follow, ('user', 'author')),
+}
+FORMATS = ('ndjson', 'csv')
+
+
+class Stats:
+    """Число строк и время по моделям."""
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+
+    @contextmanager
+    def measure(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = (self.seconds.get(name, 0)
+                                  + time.perf_counter() - started)
+
+    def count(self, name, rows):
+        self.rows[name] = self.rows.get(name, 0) + rows
+
+    def rate(self, name):
+        seconds = self.seconds.get(name)
+        return self.rows.get(name, 0) / seconds if seconds else 0.0
+
+
+def _is_user(field):
+    return field.is_relation and field.related_model is User
+
+
+def _columns(model, fields):
+    """Колонки ``values_list`` для полей выгрузки."""
+    columns = []
+    for name in fields:
+        field = model._meta.get_field(name)
+        if _is_user(field):
+            columns.append(f'{name}__username')
+        else:
+            columns.append(field.attname)
+    return columns
+
+
+def _plain(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(names=None, chunk_size=2000, using=None):
+    """Записи выгрузки по порядку: пары (модель, словарь полей)."""
+    using = using or settings.EXPORT_DATABASE
+    for name, (model, fields) in MODELS.items():
+        if names and name not in names:
+            continue
+        queryset = (model._default_manager.using(using).order_by('pk')
+                    .values_list(*_columns(model, fields)))
+        for values in queryset.iterator(chunk_size=chunk_size):
+            yield name, dict(zip(fields, map(_plain, values)))
+
+
+def write_ndjson(rows, stream, stats):
+    for name, group in groupby(rows, key=lambda row: row[0]):
+        with stats.measure(name):
+            for _, record in group:
+                stream.write(json.dumps(
+                    {'model': name, **record}, ensure_ascii=False) + '\n')
+                stats.count(name, 1)
+
+
+def write_csv(rows, directory, stats):
+    os.makedirs(directory, exist_ok=True)
+    for name, group in groupby(rows, key=lambda row: row[0]):
+        path = os.path.join(directory, f'{name}.csv')
+        with stats.measure(name), open(path, 'w', encoding='utf-8',
+                                       newline='') as stream:
+            writer = csv.DictWriter(stream, fieldnames=MODELS[name][1])
+            writer.writeheader()
+            for _, record in group:
+                writer.writerow(record)
+                stats.count(name, 1)
+
+
+def read_ndjson(stream):
+    for line in stream:
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop('model'), record
+
+
+def read_csv(directory):
+    for name in MODELS:
+        path = os.path.join(directory, f'{name}.csv')
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding='utf-8', newline='') as stream:
+            for record in csv.DictReader(stream):
+                yield name, record
+
+
+class _Users:
+    """username → pk; недостающие пользователи создаются пачкой."""
+
+    def __init__(self):
+        self.ids = {}
+
+    def resolve(self, usernames):
+        missing = set(usernames) - self.ids.keys()
+        if not missing:
+            return
+        self.ids.update(User.objects.filter(username__in=missing)
+                        .values_list('username', 'pk'))
+        new = missing - self.ids.keys()
+        if new:
+            unusable = make_password(None)
+            User.objects.bulk_create(
+                [User(username=username, password=unusable)
+                 for username in new])
+            self.ids.update(User.objects.filter(username__in=new)
+                            .values_list('username', 'pk'))
+
+
+def _auto_dates(model):
+    return [field for field in model._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+            or getattr(field, 'auto_now_add', False)]
+
+
+def _restore_dates(model, fields, objects):
+    """Вернуть строкам даты из выгрузки, которые заменил ``bulk_create``.
+
+    ``objects`` — пары (pk, {поле: дата}). Поля моделей не трогаются:
+    ``auto_now`` остаётся включённым для остальных потоков процесса.
+    """
+    # по 100 строк: SQLite старше 3.32 принимает до 999 параметров
+    for chunk in batched(objects, 100):
+        model.objects.filter(pk__in=[pk for pk, _ in chunk]).update(**{
+            field.name: Case(
+                *(When(pk=pk, then=Value(dates[field.name]))
+                  for pk, dates in chunk),
+                output_field=field)
+            for field in fields})
+
+
+def _insert(model, dates, objects, ignore_conflicts):
+    kept = [(obj.pk, {field.name: getattr(obj, field.name)
+                      for field in dates})
+            for obj in objects] if dates else []
+    if kept and ignore_conflicts:
+        # даты уже загруженных строк не меняются
+        present = set(model.objects.filter(
+            pk__in=[pk for pk, _ in kept]).values_list('pk', flat=True))
+        kept = [(pk, values) for pk, values in kept if pk not in present]
+    model.objects.bulk_create(objects, ignore_conflicts=ignore_conflicts)
+    if kept:
+        _restore_dates(model, dates, kept)
+
+
+def _build(model, fields, record, users, now):
+    values = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = record.get(name)
+        if value == '' and field.null:
+            value = None
+        if _is_user(field):
+            values[field.attname] = users.ids[value]
+        elif field.is_relation:
+            values[field.attname] = (
+                None if value is None
+                else field.target_field.to_python(value))
+        elif value is None and (getattr(field, 'auto_now', False)
+                                or getattr(field, 'auto_now_add', False)):
+            values[name] = now
+        else:
+            values[name] = field.to_python(value)
+    return model(**values)
+
+
+def import_rows(rows, batch_size=2000, ignore_conflicts=False):
+    """Загрузить записи пачками и пересчитать производные данные."""
+    stats = Stats()
+    users = _Users()
+    now = timezone.now()
+    for name, group in groupby(rows, key=lambda row: row[0]):
+        model, fields = MODELS[name]
+        user_fields = [field for field in fields
+                       if _is_user(model._meta.get_field(field))]
+        dates = _auto_dates(model)
+        with stats.measure(name):
+            for batch in batched((record for _, record in group),
+                                 batch_size):
+                with transaction.atomic():
+                    users.resolve(record[field] for record in batch
+                                  for field in user_fields)
+                    _insert(model, dates, [
+                        _build(model, fields, record, users, now)
+                        for record in batch], ignore_conflicts)
+                stats.count(name, len(batch))
+    _reset_sequences()
+    with stats.measure('rebuild'):
+        counters.rebuild(batch_size=batch_size)
+        feed.rebuild()
+        if search.is_available():
+            search.rebuild(batch_size=batch_size)
+        cache.clear()
+    return stats
+
+
+def _reset_sequences():
+    # после вставки с явными pk счётчики PostgreSQL отстают от данных
+    connection = connections['default']
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for model, _ in MODELS.values()])
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
@@ -1,10 +1,201 @@
+import base64
+import heapq
+import json
+from collections.abc import Sequence
+from itertools import islice
+from operator import itemgetter
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 from yatube.settings import SAMPLING
 
 
-def get_paginator(posts, request):
+def get_paginator(posts, request, cursor=None, key='pk'):
+    """Страница постов; cursor=True включает курсор независимо от view."""
+    if cursor or (cursor is None and is_cursor_paginated(request)):
+        return get_cursor_page(posts, request.GET.get('cursor'), key=key)
     paginator = Paginator(posts, SAMPLING)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
+
+
+def get_merged_paginator(sources, request, cursor=None):
+    """Страница из источников — пар ``(queryset, key)``, как get_paginator."""
+    if cursor or (cursor is None and is_cursor_paginated(request)):
+        return get_merged_cursor_page(sources, request.GET.get('cursor'))
+    paginator = Paginator(MergedRows(sources), SAMPLING)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def batched(iterable, size):
+    """Разбить поток на списки по size элементов."""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+def is_cursor_paginated(request):
+    """Включена ли для текущего view курсорная пагинация."""
+    match = request.resolver_match
+    return (match is not None
+            and match.view_name in settings.CURSOR_PAGINATION_VIEWS)
+
+
+def get_template_engine(request):
+    """Движок шаблонов текущего view: jinja2 для ``JINJA2_VIEWS``."""
+    match = request.resolver_match
+    if match is not None and match.view_name in settings.JINJA2_VIEWS:
+        return 'jinja2'
+    return 'django'
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации: без COUNT(*) и OFFSET."""
+    cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return (f'<CursorPage {self.previous_cursor}:{self.next_cursor} '
+                f'of {len(self)} objects>')
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(obj, direction, field='pub_date', key='pk'):
+    """Непрозрачный курсор по ключу ``(field, key)``."""
+    return _encode_position(direction, getattr(obj, field), getattr(obj, key))
+
+
+def _encode_position(direction, value, pk):
+    position = [direction, value.isoformat(), pk]
+    raw = json.dumps(position, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Разобрать курсор; для испорченного курсора вернуть None."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, value, pk = json.loads(raw)
+        value, pk = parse_datetime(value), int(pk)
+    except (TypeError, ValueError):
+        return None
+    if direction not in ('next', 'prev') or value is None:
+        return None
+    return direction, value, pk
+
+
+def get_cursor_page(queryset, cursor=None, per_page=None, field='pub_date',
+                    key='pk'):
+    """Страница по ключу ``(field, key)`` от новых к старым.
+
+    Следующая страница выбирается условием «меньше курсора», предыдущая —
+    «больше курсора» в обратном порядке, поэтому глубина страницы не
+    влияет на стоимость запроса.
+    """
+    return get_merged_cursor_page(
+        [(queryset, key)], cursor, per_page, field)
+
+
+def _keyed_rows(queryset, field, key, limit, position=None, reverse=True):
+    """Первые ``limit`` строк источника после позиции в порядке ключа."""
+    order = '-' if reverse else ''
+    queryset = queryset.order_by(f'{order}{field}', f'{order}{key}')
+    if position is not None:
+        _, value, pk = position
+        op = 'lt' if reverse else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{field}__{op}': value})
+            | Q(**{field: value, f'{key}__{op}': pk}))
+    return (((getattr(row, field), getattr(row, key)), row)
+            for row in queryset[:limit])
+
+
+def _merge_rows(sources, field, limit, position=None, reverse=True):
+    """Слить первые ``limit`` строк непересекающихся источников по ключу.
+
+    Каждый источник — пара ``(queryset, key)`` и читается отдельным
+    запросом по своему индексу, поэтому база не сортирует их объединение.
+    """
+    runs = [list(_keyed_rows(queryset, field, key, limit, position, reverse))
+            for queryset, key in sources]
+    merged = heapq.merge(*runs, key=itemgetter(0), reverse=reverse)
+    return list(islice(merged, limit))
+
+
+def get_merged_cursor_page(sources, cursor=None, per_page=None,
+                           field='pub_date'):
+    """Курсорная страница из источников — пар ``(queryset, key)``.
+
+    Источники не пересекаются и упорядочены по общему ключу
+    ``(field, key)``, например ``(pub_date, post_id)`` строк ленты и
+    ``(pub_date, pk)`` постов: курсор хранит этот ключ, а не pk строки.
+    """
+    per_page = per_page or SAMPLING
+    position = decode_cursor(cursor)
+    backward = position is not None and position[0] == 'prev'
+    rows = _merge_rows(sources, field, per_page + 1, position,
+                       reverse=not backward)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backward:
+        rows.reverse()
+    if not rows:
+        return CursorPage(rows)
+    if backward:
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, position is not None
+    (first, first_pk), _ = rows[0]
+    (last, last_pk), _ = rows[-1]
+    return CursorPage(
+        [row for _, row in rows],
+        next_cursor=(_encode_position('next', last, last_pk)
+                     if has_next else None),
+        previous_cursor=(_encode_position('prev', first, first_pk)
+                         if has_previous else None),
+    )
+
+
+class MergedRows:
+    """Непересекающиеся источники как один список для ``Paginator``.
+
+    Срез ``[a:b]`` читает из каждого источника первые ``b`` строк по его
+    индексу и сливает их по ключу ``(field, key)``.
+    """
+
+    def __init__(self, sources, field='pub_date'):
+        self.sources = sources
+        self.field = field
+
+    def count(self):
+        return sum(queryset.count() for queryset, _ in self.sources)
+
+    def __getitem__(self, index):
+        rows = _merge_rows(self.sources, self.field, index.stop)
+        return [row for _, row in rows[index.start:]]
@@ -1,11 +1,19 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import (cache, comments, counters, feed, follows, freshness,
+               pagecache, revisions, search)
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post, User
-from .utils import get_paginator
+from .utils import get_paginator, get_template_engine
 
 
+@freshness.page(freshness.index_state)
+@pagecache.cached(freshness.index_state)
 def index(request):
     posts = Post.objects.select_related('author', 'group')
     template = 'posts/index.html'
@@ -13,52 +21,78 @@ def index(request):
     context = {
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=get_template_engine(request))
 
 
+@freshness.page(freshness.group_state)
+@pagecache.cached(freshness.group_state)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = cache.get_object_or_404(Group, slug=slug)
     template = 'posts/group_list.html'
-    page_obj = get_paginator(group.posts.all(), request)
+    page_obj = get_paginator(
+        group.posts.select_related('author', 'group'), request)
     context = {
         'group': group,
         'page_obj': page_obj
     }
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=get_template_engine(request))
 
 
+@freshness.page(freshness.profile_page_state)
+@pagecache.cached(freshness.profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = cache.get_object_or_404(User, username=username)
     template = 'posts/profile.html'
-    page_obj = get_paginator(author.posts.all(), request)
-    posts_amount = author.posts.count()
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(
-            user__username=request.user, author__username=username).exists())
+    page_obj = get_paginator(
+        author.posts.select_related('author', 'group'), request)
+    posts_amount = counters.get_stats(author).post_count
+    following = follows.for_request(request).is_following(author.pk)
     context = {
         'author': author,
         'following': following,
         'page_obj': page_obj,
         'posts_amount': posts_amount
     }
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=get_template_engine(request))
 
 
+@pagecache.cached(pagecache.page_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    author_posts = post.author.posts.count()
-    num_author_posts = Post.objects.filter(author=author_posts).count()
+    post = cache.get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    author_posts = counters.get_stats(post.author).post_count
     comment_form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         'post': post,
         'author_posts': author_posts,
-        'posts_count': num_author_posts,
+        'posts_count': author_posts,
         'form': comment_form,
-        'comments': comments,
+        'comments': comments.get_page(post, request.GET.get('cursor')),
     }
-    return render(request, 'posts/post_detail.html', context)
+    return render(request, 'posts/post_detail.html', context,
+                  using=get_template_engine(request))
+
+
+def post_comments(request, post_id):
+    """Следующие страницы комментариев поста в JSON."""
+    post = cache.get_object_or_404(Post, pk=post_id)
+    page = comments.get_page(post, request.GET.get('cursor'))
+    return JsonResponse(comments.serialize(page))
+
+
+def search_posts(request):
+    """Поиск по постам, комментариям и группам, лучшие совпадения первыми."""
+    query = request.GET.get('q', '').strip()
+    page_obj = search.search(query, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'page_params': urlencode({'q': query}),
+    }
+    return render(request, 'posts/search.html', context)
 
 
 @login_required
@@ -79,11 +113,17 @@ def post_edit(request, post_id):
     template = 'posts/create_post.html'
     if post.author != request.user:
         return redirect('posts:post_detail', post_id=post.pk)
+    previous_text = post.text
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            # только поля формы: comment_count и миниатюры в памяти могли
+            # устареть, пока пользователь правил пост
+            post = form.save(commit=False)
+            post.save(update_fields=[*form._meta.fields, 'updated_at'])
+            revisions.record(post, previous_text, request.user)
         return redirect('posts:post_detail', post_id=post.pk)
     context = {
         'form': form,
@@ -93,6 +133,27 @@ def post_edit(request, post_id):
     return render(request, template, context)
 
 
+def post_history(request, post_id):
+    """Правки текста поста и разница выбранной версии со следующей."""
+    post = get_object_or_404(Post.objects.select_related('author'),
+                             pk=post_id)
+    history = list(
+        post.revisions.select_related('editor').defer('delta'))
+    context = {'post': post, 'revisions': history}
+    if history:
+        try:
+            number = int(request.GET.get('version', history[-1].number))
+        except ValueError:
+            raise Http404('Некорректный номер версии')
+        if not 1 <= number <= history[-1].number:
+            raise Http404('Нет такой версии')
+        context['number'] = number
+        context['diff'] = revisions.diff(
+            revisions.get_text(post, number),
+            revisions.get_text(post, number + 1))
+    return render(request, 'posts/post_history.html', context)
+
+
 @login_required
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
@@ -108,14 +169,13 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     """Посты авторов,на которых подписан текущий пользователь, не более 10"""
-    user = request.user
-    posts = Post.objects.filter(author__following__user=user)
-    page_obj = get_paginator(posts, request)
+    page_obj = feed.get_follow_page(request.user, request)
     template = 'posts/follow.html'
     context = {
         'page_obj': page_obj,
     }
-    return render(request, template, context)
+    return render(request, template, context,
+                  using=get_template_engine(request))
 
 
 @login_required
@@ -0,0 +1,110 @@
+"""Окружение Jinja2 для страниц из ``JINJA2_VIEWS``.
+
+Шаблоны в каталоге ``jinja2/`` повторяют разметку одноимённых шаблонов
+Django. Здесь собраны замены тегов и фильтров, которые в них нужны:
+``url``, ``static``, ``now``, ``date``, ``linebreaks``, ``title``,
+``addclass``, ``post_cards``, ``post_picture``, ``is_following``,
+``suggested_authors``, ``hole`` и фрагментный кэш ``cached`` (через
+``{% call %}``) с теми же ключами, что у ``{% cache %}``.
+"""
+from datetime import datetime
+
+import jinja2
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils import timezone
+from markupsafe import Markup
+
+from core import routers
+from core.templatetags.user_filters import addclass
+from posts import cache, cards, follows, pagecache
+from posts.templatetags.post_images import post_picture
+
+
+def url(name, *args, **kwargs):
+    return reverse(name, args=args, kwargs=kwargs)
+
+
+def now(format_string):
+    tzinfo = timezone.get_current_timezone() if settings.USE_TZ else None
+    return defaultfilters.date(datetime.now(tz=tzinfo), format_string)
+
+
+def date(value, format_string=None):
+    return defaultfilters.date(timezone.template_localtime(value),
+                               format_string)
+
+
+def linebreaks(value):
+    return defaultfilters.linebreaks_filter(value, autoescape=True)
+
+
+@jinja2.pass_context
+def is_following(context, author_id):
+    return follows.for_request(context['request']).is_following(author_id)
+
+
+@jinja2.pass_context
+def suggested_authors(context):
+    return follows.for_request(context['request']).suggested()
+
+
+@jinja2.pass_context
+def hole(context, template_name, **args):
+    """Как ``{% hole %}`` из ``page_holes``."""
+    if pagecache.punching():
+        return Markup(pagecache.marker(template_name, args))
+    template = context.environment.get_template(template_name)
+    return Markup(''.join(template.generate({**context.get_all(), **args})))
+
+
+def cached(fragment_name, *vary_on, caller):
+    """Как ``{% cache %}`` со сроком ``CACHE_FRAGMENT_TIMEOUT``.
+
+    Фрагмент, прочитанный с реплики, не сохраняется.
+    """
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = caches['default']
+    key = make_template_fragment_key(fragment_name, vary_on)
+    value = fragment_cache.get(key)
+    if value is None:
+        value = caller()
+        if not routers.reading_replica():
+            fragment_cache.set(key, value, settings.CACHE_FRAGMENT_TIMEOUT)
+    return Markup(value)
+
+
+class Template(jinja2.Template):
+    """Шаблон окружения; под тестами ``core.runner`` подменяет ``render``."""
+
+
+class Environment(jinja2.Environment):
+    template_class = Template
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.globals.update({
+            'url': url,
+            'static': static,
+            'now': now,
+            'hole': hole,
+            'cached': cached,
+            'cache_version': cache.get_version,
+            'post_picture': post_picture,
+            'is_following': is_following,
+            'suggested_authors': suggested_authors,
+        })
+        self.filters.update({
+            'date': date,
+            'linebreaks': linebreaks,
+            'title': defaultfilters.title,
+            'truncatechars': defaultfilters.truncatechars,
+            'addclass': addclass,
+            'post_cards': cards.prepare,
+        })
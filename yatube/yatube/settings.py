@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -43,6 +44,7 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',   # Добавленная запись  users
     'core.apps.CoreConfig',     # Добавленная запись  core
     'about.apps.AboutConfig',   # Добавленная запись  about
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -53,6 +55,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -60,18 +63,33 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'core.runner.TestRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+# Скомпилированные шаблоны держит в памяти cached.Loader. При DEBUG Django
+# сам его не включает, поэтому загрузчики перечислены явно; для правки
+# шаблонов без перезапуска сервера — TEMPLATE_CACHE=0.
+TEMPLATE_CACHE = os.getenv('TEMPLATE_CACHE', '1') == '1'
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if TEMPLATE_CACHE:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -84,18 +102,137 @@ TEMPLATES = [
     },
 ]
 
+# Jinja2 — необязательный второй движок: им рендерятся только view из
+# JINJA2_VIEWS (имена через запятую, например
+# JINJA2_VIEWS=posts:index,posts:post_detail), остальные страницы
+# остаются у DjangoTemplates. Готовы шаблоны лент и страницы поста:
+# posts:index, posts:group_list, posts:profile, posts:follow_index,
+# posts:post_detail. Шаблоны Jinja2 лежат в jinja2/ под теми же именами;
+# без установленного Jinja2 движок не подключается, и все view рендерит
+# Django.
+JINJA2_INSTALLED = find_spec('jinja2') is not None
+JINJA2_VIEWS = set()
+if JINJA2_INSTALLED:
+    TEMPLATES.append({
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [os.path.join(BASE_DIR, 'jinja2')],
+        'OPTIONS': {
+            'environment': 'yatube.jinja2.Environment',
+            'auto_reload': not TEMPLATE_CACHE,
+            'context_processors': TEMPLATES[0]['OPTIONS'][
+                'context_processors'],
+        },
+    })
+    JINJA2_VIEWS.update(
+        filter(None, os.getenv('JINJA2_VIEWS', '').split(',')))
+
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# Профиль базы выбирается переменной DATABASE_ENGINE. sqlite — для
+# разработки и небольших установок: WAL и synchronous=NORMAL (см.
+# SQLITE_PRAGMAS) позволяют читать во время записи. postgresql — для
+# продакшена: постоянные соединения на CONN_MAX_AGE секунд; с
+# DATABASE_POOLER=pgbouncer (пул в режиме transaction) серверные курсоры
+# отключаются, а выгрузки идут через прямое соединение direct, если задан
+# POSTGRES_DIRECT_HOST. Django 2.2 работает с psycopg2 < 2.9.
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'sqlite')
+DATABASE_POOLER = os.getenv('DATABASE_POOLER', '')
+
+if DATABASE_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv('POSTGRES_DB', 'yatube'),
+            'USER': os.getenv('POSTGRES_USER', 'yatube'),
+            'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
+            'HOST': os.getenv('POSTGRES_HOST', 'localhost'),
+            'PORT': os.getenv('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.getenv('DATABASE_CONN_MAX_AGE', 60)),
+            'DISABLE_SERVER_SIDE_CURSORS': DATABASE_POOLER == 'pgbouncer',
+            'OPTIONS': {
+                'connect_timeout': int(
+                    os.getenv('DATABASE_CONNECT_TIMEOUT', 5)),
+            },
+        }
+    }
+    if os.getenv('POSTGRES_DIRECT_HOST'):
+        DATABASES['direct'] = {
+            **DATABASES['default'],
+            'HOST': os.getenv('POSTGRES_DIRECT_HOST'),
+            'PORT': os.getenv('POSTGRES_DIRECT_PORT', '5432'),
+            'CONN_MAX_AGE': 0,
+            'DISABLE_SERVER_SIDE_CURSORS': False,
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv('SQLITE_PATH',
+                              os.path.join(BASE_DIR, 'db.sqlite3')),
+        }
     }
+# Прагмы, которые выполняются на каждом новом соединении SQLite. WAL
+# пускает читателей во время записи, busy_timeout заставляет писателя ждать
+# блокировку вместо ошибки «database is locked». Переменная SQLITE_PRAGMAS
+# («synchronous=FULL,mmap_size=0») переопределяет отдельные значения.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,  # мс
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,  # КиБ, около 64 МБ на соединение
+    'mmap_size': 268435456,  # 256 МБ
+    'temp_store': 'MEMORY',
 }
+SQLITE_PRAGMAS.update(
+    pragma.split('=', 1)
+    for pragma in os.getenv('SQLITE_PRAGMAS', '').split(',') if pragma)
+# поведение SQLite и модуля sqlite3 по умолчанию, с которым
+# benchmark --compare-pragmas сравнивает SQLITE_PRAGMAS
+SQLITE_BASELINE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+}
+# база для долгих потоковых выгрузок с серверными курсорами
+EXPORT_DATABASE = 'direct' if 'direct' in DATABASES else 'default'
+
+# Реплики только для чтения через запятую: пути к файлам SQLite или хосты
+# PostgreSQL. Локально файлы SQLite наполняет команда sync_replicas; в
+# тестах реплики смотрят в default.
+DATABASE_READ_REPLICAS = []
+for number, location in enumerate(
+        filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST' if DATABASE_ENGINE == 'postgresql' else 'NAME': location,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_READ_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# страницы, которые читают реплики
+REPLICA_READ_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+    'posts:follow_index',
+    'api:post_list',
+    'api:post_detail',
+    'api:post_comments',
+    'api:group_posts',
+    'api:profile',
+    'api:profile_posts',
+    'api:follow_feed',
+}
+# сколько секунд после записи пользователь читает основную базу
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'primary_until'
 
 
 # Password validation
@@ -152,14 +289,118 @@ SAMPLING = 10
 SYMBOLS_POST: int = 15
 # должно быть ... постов
 NUMBER_POST: int = 3
+# view, которые листаются курсором по (pub_date, id) вместо номера страницы,
+# например {'posts:index', 'posts:group_list', 'posts:profile',
+# 'posts:follow_index'}
+CURSOR_PAGINATION_VIEWS = set()
+# комментариев на странице поста и в JSON-выдаче
+COMMENTS_PER_PAGE: int = 20
+# с какого числа подписчиков посты автора не раскладываются по лентам,
+# а подмешиваются в ленту при чтении
+FEED_FANOUT_LIMIT: int = 1000
+# размер пачки bulk_create при заполнении лент
+FEED_BATCH_SIZE: int = 500
+# Граф подписок в памяти каждого процесса (posts.graph): ленты и кнопки
+# подписки читают его вместо таблицы Follow. Около 8 байт на подписку.
+FOLLOW_GRAPH_ENABLED = os.getenv('FOLLOW_GRAPH_ENABLED', '0') == '1'
+# после стольких подписок и отписок изменения сливаются в массивы графа
+FOLLOW_GRAPH_COMPACT_EVERY = 10000
+# журнал подписок в кэше: сколько записей граф догоняет, а не загружает
+# заново, и сколько секунд хранится запись
+FOLLOW_GRAPH_LOG_LIMIT = 10000
+FOLLOW_GRAPH_LOG_TIMEOUT = 3600
+# рекомендации «кого почитать» (команда build_suggestions): сколько
+# авторов хранится на пользователя и сколько показывается на странице
+SUGGESTIONS_TOP_K = 10
+SUGGESTIONS_SHOWN = 5
+# сколько слов запроса учитывает полнотекстовый поиск
+SEARCH_MAX_TERMS: int = 8
+
+# размеры миниатюр картинок постов: имя -> (геометрия, параметры sorl)
+THUMBNAIL_SIZES = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+# адаптивные варианты картинок постов для <picture>/srcset
+IMAGE_VARIANT_WIDTHS = (480, 960, 1440)
+IMAGE_VARIANT_FORMATS = ('avif', 'webp', 'jpeg')
+IMAGE_VARIANT_RATIO = (960, 339)
+IMAGE_VARIANT_SIZES = '(max-width: 960px) 100vw, 960px'
+# потоков для фоновой генерации миниатюр; 0 — сразу после коммита
+THUMBNAIL_WORKERS = 2
+
+# Метрики запросов (core.middleware.MetricsMiddleware): число и время
+# SQL-запросов, время шаблонов, попадания в кэш. Приёмник log пишет JSON в
+# логгер yatube.metrics, statsd шлёт UDP на METRICS_STATSD_ADDRESS.
+# Тесты (core.runner.TestRunner) включают метрики сами.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+METRICS_SINK = os.getenv('METRICS_SINK', 'log')
+METRICS_STATSD_ADDRESS = os.getenv('METRICS_STATSD_ADDRESS', 'localhost:8125')
+# сколько одинаковых по форме запросов считать признаком N+1
+METRICS_REPEATED_QUERY_THRESHOLD = 5
+# наибольшее допустимое число SQL-запросов на страницу; при
+# QUERY_BUDGET_STRICT превышение — ошибка, а не предупреждение в логе
+QUERY_BUDGET_STRICT = False
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 6,
+    'posts:profile': 8,
+    'posts:post_detail': 6,
+    # сессия, пользователь, тяжёлые авторы, число и страница ленты,
+    # подписки читателя и рекомендации
+    'posts:follow_index': 7,
+}
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Кэш, общий для всех процессов WSGI: file — каталог на диске, db — таблица
+# SQLite/PostgreSQL (создаётся командой createcachetable), memcached —
+# сервер memcached. locmem оставлен для разработки и тестов. В file add()
+# и incr() не атомарны: блокировка пересчёта в posts.cache там не
+# исключает параллельный пересчёт, поэтому под нагрузкой нужен memcached
+# или db.
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+    'db': ('django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+    'memcached': ('django.core.cache.backends.memcached.MemcachedCache',
+                  '127.0.0.1:11211'),
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.getenv('CACHE_LOCATION',
+                              CACHE_BACKENDS[CACHE_BACKEND][1]),
     }
 }
+if CACHE_BACKEND != 'memcached':
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+    }
+# Фрагменты лент хранятся без срока жизни, а устаревают сменой поколения
+# области (posts.cache). Поколение видно всем процессам только в общем
+# кэше; в locmem запись меняет его лишь у процесса, который её выполнил,
+# поэтому там фрагменты живут ограниченный срок, сек.
+CACHE_SHARED = CACHE_BACKEND != 'locmem'
+CACHE_FRAGMENT_TIMEOUT = None if CACHE_SHARED else 20
+# срок свежести объектов в cache-aside, сек.
+CACHE_ASIDE_TIMEOUT = 300
+# сколько держится блокировка пересчёта ключа, сек.
+CACHE_LOCK_TIMEOUT = 10
+# сколько секунд обратный прокси отдаёт анонимную ленту без перепроверки
+PAGE_PROXY_MAX_AGE = int(os.getenv('PAGE_PROXY_MAX_AGE', 60))
+# Кэш целых страниц лент и постов (posts.pagecache). Выключен по умолчанию:
+# ответ из кэша приходит без view, и тестовый клиент не видит контекст.
+PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', '0') == '1'
+PAGE_CACHE_ALIAS = 'default'
+# страница живёт в кэше, пока не сменится поколение её областей, но не
+# дольше этого срока, сек.
+PAGE_CACHE_TIMEOUT = int(os.getenv('PAGE_CACHE_TIMEOUT', 600))
+
+# каждая N-я версия поста в истории правок хранится целиком, а не дельтой
+REVISION_SNAPSHOT_EVERY = 20